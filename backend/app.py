@@ -13,7 +13,11 @@ Provides REST API for:
 import os
 import uuid
 import time
+import hashlib
 import logging
+import itertools
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional
 from datetime import datetime
@@ -30,7 +34,6 @@ from config import (
     REPLICATION_FACTOR,
     CHUNK_SIZE,
     SECRET_KEY,
-    TEMP_STORAGE,
     DATA_DIR,
 )
 from shared.crypto import (
@@ -59,6 +62,7 @@ from backend.auth import (
     get_user_encryption_key,
 )
 from backend import uploader
+from shared import json_provider, package_zip
 
 # Configure logging
 logging.basicConfig(
@@ -70,6 +74,7 @@ LOG = logging.getLogger("backend")
 # Flask app
 app = Flask(__name__, static_folder=None)
 app.config["SECRET_KEY"] = SECRET_KEY
+json_provider.install(app)
 CORS(app, supports_credentials=True)
 
 # Initialize database
@@ -81,6 +86,11 @@ blockchain = SimpleBlockchain()
 # Frontend directory
 FRONTEND_DIR = Path(__file__).parent.parent / "frontend"
 
+# Chunks encrypted and distributed concurrently during an upload
+UPLOAD_CHUNK_WORKERS = 8
+# Chunks fetched and decrypted concurrently (ahead of the client) on download
+DOWNLOAD_CHUNK_WORKERS = 8
+
 
 # =============================================================================
 # Helpers
@@ -289,99 +299,104 @@ def upload_file():
     
     LOG.info(f"Upload started: {filename} by user {user.username}")
     
-    # Save file temporarily
-    temp_path = TEMP_STORAGE / f"{file_id}_{filename}"
-    file.save(str(temp_path))
-    file_size = temp_path.stat().st_size
+    # Generate file encryption key
+    file_key = generate_file_key()
     
-    try:
-        # Generate file encryption key
-        file_key = generate_file_key()
-        
-        # Chunk, encrypt, and distribute
-        chunk_hashes = []
-        chunk_records = []
-        
-        for idx, chunk_data, chunk_hash in chunk_file(file_path=temp_path, chunk_size=CHUNK_SIZE):
-            # Encrypt chunk
-            encrypted_chunk = encrypt_chunk(chunk_data, file_key)
-            encrypted_hash = compute_hash(encrypted_chunk)
-            
-            # Distribute to peers
-            assignments = uploader.distribute_chunk(
-                chunk_data=encrypted_chunk,
-                chunk_hash=encrypted_hash,
-                discovery_url=DISCOVERY_URL,
-                replication=REPLICATION_FACTOR,
-            )
-            
-            chunk_hashes.append(chunk_hash)  # Original hash for Merkle tree
-            chunk_records.append({
-                "index": idx,
-                "original_hash": chunk_hash,  # Hash of plaintext (for Merkle)
-                "encrypted_hash": encrypted_hash,  # Hash of ciphertext (for retrieval)
-                "size": len(encrypted_chunk),
-                "assignments": assignments,
-            })
-            
-            LOG.debug(f"Chunk {idx}: {len(assignments)} assignments")
-        
-        # Compute Merkle root (from original plaintext hashes)
-        merkle_root = compute_merkle_root(chunk_hashes)
+    # Chunk, encrypt, and distribute
+    chunk_hashes = []
+    chunk_records = []
+    file_hasher = hashlib.sha256()
+    file_size = 0
+    
+    def process_chunk(item):
+        idx, chunk_data, chunk_hash = item
         
-        # Encrypt file key with user's key
-        encrypted_file_key = encrypt_file_key(file_key, user_key)
+        # Encrypt chunk
+        encrypted_chunk = encrypt_chunk(chunk_data, file_key)
+        encrypted_hash = compute_hash(encrypted_chunk)
         
-        # Compute file hash
-        file_hash = compute_hash(temp_path.read_bytes())
+        # Distribute to peers
+        assignments = uploader.distribute_chunk(
+            chunk_data=encrypted_chunk,
+            chunk_hash=encrypted_hash,
+            discovery_url=DISCOVERY_URL,
+            replication=REPLICATION_FACTOR,
+        )
         
-        # Build metadata
-        metadata = {
-            "file_id": file_id,
-            "owner_id": user.id,
-            "owner_username": user.username,
-            "filename": filename,
-            "file_size": file_size,
-            "file_hash": file_hash,
-            "merkle_root": merkle_root,
-            "chunk_count": len(chunk_records),
-            "chunk_size": CHUNK_SIZE,
-            "chunks": chunk_records,
-            "encrypted_file_key": b64_encode(encrypted_file_key),
-            "timestamp": timestamp,
-            "created_at": datetime.utcnow().isoformat(),
+        LOG.debug(f"Chunk {idx}: {len(assignments)} assignments")
+        return {
+            "index": idx,
+            "original_hash": chunk_hash,  # Hash of plaintext (for Merkle)
+            "encrypted_hash": encrypted_hash,  # Hash of ciphertext (for retrieval)
+            "size": len(encrypted_chunk),
+            "assignments": assignments,
         }
-        
-        # Add to blockchain
-        block = blockchain.add_block(metadata)
-        
-        LOG.info(f"Upload complete: {filename} ({len(chunk_records)} chunks) -> block {block['index']}")
-        
-        # Update user's storage usage
-        session = get_session()
-        try:
-            user_record = session.query(User).filter_by(id=user.id).first()
-            if user_record:
-                user_record.storage_used_bytes += file_size
-                session.commit()
-        finally:
-            session.close()
-        
-        return jsonify({
-            "status": "ok",
-            "file_id": file_id,
-            "filename": filename,
-            "file_size": file_size,
-            "chunk_count": len(chunk_records),
-            "merkle_root": merkle_root,
-            "block_index": block["index"],
-            "block_hash": block["hash"],
-        })
-        
+    
+    # Chunks are independent; read the upload stream a bounded window
+    # at a time so memory stays proportional to the window, not the file
+    chunks = chunk_file(file_obj=file.stream, chunk_size=CHUNK_SIZE)
+    with ThreadPoolExecutor(max_workers=UPLOAD_CHUNK_WORKERS) as executor:
+        while True:
+            window = list(itertools.islice(chunks, UPLOAD_CHUNK_WORKERS * 2))
+            if not window:
+                break
+            for _, chunk_data, _ in window:
+                file_hasher.update(chunk_data)
+                file_size += len(chunk_data)
+            for record in executor.map(process_chunk, window):
+                chunk_hashes.append(record["original_hash"])  # Original hash for Merkle tree
+                chunk_records.append(record)
+    
+    # Compute Merkle root (from original plaintext hashes)
+    merkle_root = compute_merkle_root(chunk_hashes)
+    
+    # Encrypt file key with user's key
+    encrypted_file_key = encrypt_file_key(file_key, user_key)
+    
+    file_hash = file_hasher.hexdigest()
+    
+    # Build metadata
+    metadata = {
+        "file_id": file_id,
+        "owner_id": user.id,
+        "owner_username": user.username,
+        "filename": filename,
+        "file_size": file_size,
+        "file_hash": file_hash,
+        "merkle_root": merkle_root,
+        "chunk_count": len(chunk_records),
+        "chunk_size": CHUNK_SIZE,
+        "chunks": chunk_records,
+        "encrypted_file_key": b64_encode(encrypted_file_key),
+        "timestamp": timestamp,
+        "created_at": datetime.utcnow().isoformat(),
+    }
+    
+    # Add to blockchain
+    block = blockchain.add_block(metadata)
+    
+    LOG.info(f"Upload complete: {filename} ({len(chunk_records)} chunks) -> block {block['index']}")
+    
+    # Update user's storage usage
+    session = get_session()
+    try:
+        user_record = session.query(User).filter_by(id=user.id).first()
+        if user_record:
+            user_record.storage_used_bytes += file_size
+            session.commit()
     finally:
-        # Clean up temp file
-        if temp_path.exists():
-            temp_path.unlink()
+        session.close()
+    
+    return jsonify({
+        "status": "ok",
+        "file_id": file_id,
+        "filename": filename,
+        "file_size": file_size,
+        "chunk_count": len(chunk_records),
+        "merkle_root": merkle_root,
+        "block_index": block["index"],
+        "block_hash": block["hash"],
+    })
 
 
 # =============================================================================
@@ -437,41 +452,56 @@ def download_file(file_id: str):
     # Sort chunks by index
     chunks = sorted(metadata["chunks"], key=lambda c: c["index"])
     
+    def fetch_chunk(chunk_record):
+        """Fetch, verify, and decrypt one chunk."""
+        encrypted_hash = chunk_record["encrypted_hash"]
+        original_hash = chunk_record["original_hash"]
+        assignments = chunk_record.get("assignments", [])
+        
+        # Fetch encrypted chunk from peers
+        encrypted_chunk = uploader.fetch_chunk(
+            chunk_hash=encrypted_hash,
+            assignments=assignments,
+            discovery_url=DISCOVERY_URL,
+        )
+        
+        if encrypted_chunk is None:
+            raise Exception(f"Failed to fetch chunk {chunk_record['index']}")
+        
+        # Verify encrypted chunk hash
+        if compute_hash(encrypted_chunk) != encrypted_hash:
+            raise Exception(f"Encrypted chunk {chunk_record['index']} corrupted")
+        
+        # Decrypt chunk
+        try:
+            decrypted_chunk = decrypt_chunk(encrypted_chunk, file_key)
+        except Exception as e:
+            raise Exception(f"Failed to decrypt chunk {chunk_record['index']}: {e}")
+        
+        # Verify decrypted chunk hash
+        if not verify_chunk_hash(decrypted_chunk, original_hash):
+            raise Exception(f"Decrypted chunk {chunk_record['index']} hash mismatch")
+        
+        return decrypted_chunk
+    
     def generate():
-        """Generator that fetches, decrypts, and yields chunks."""
+        """Generator that yields chunks in order while later ones are fetched."""
         decrypted_hashes = []
+        records = iter(chunks)
         
-        for chunk_record in chunks:
-            encrypted_hash = chunk_record["encrypted_hash"]
-            original_hash = chunk_record["original_hash"]
-            assignments = chunk_record.get("assignments", [])
-            
-            # Fetch encrypted chunk from peers
-            encrypted_chunk = uploader.fetch_chunk(
-                chunk_hash=encrypted_hash,
-                assignments=assignments,
-                discovery_url=DISCOVERY_URL,
+        with ThreadPoolExecutor(max_workers=DOWNLOAD_CHUNK_WORKERS) as executor:
+            pending = deque(
+                executor.submit(fetch_chunk, record)
+                for record in itertools.islice(records, DOWNLOAD_CHUNK_WORKERS * 2)
             )
-            
-            if encrypted_chunk is None:
-                raise Exception(f"Failed to fetch chunk {chunk_record['index']}")
-            
-            # Verify encrypted chunk hash
-            if compute_hash(encrypted_chunk) != encrypted_hash:
-                raise Exception(f"Encrypted chunk {chunk_record['index']} corrupted")
-            
-            # Decrypt chunk
-            try:
-                decrypted_chunk = decrypt_chunk(encrypted_chunk, file_key)
-            except Exception as e:
-                raise Exception(f"Failed to decrypt chunk {chunk_record['index']}: {e}")
-            
-            # Verify decrypted chunk hash
-            if not verify_chunk_hash(decrypted_chunk, original_hash):
-                raise Exception(f"Decrypted chunk {chunk_record['index']} hash mismatch")
-            
-            decrypted_hashes.append(compute_hash(decrypted_chunk))
-            yield decrypted_chunk
+            while pending:
+                decrypted_chunk = pending.popleft().result()
+                next_record = next(records, None)
+                if next_record is not None:
+                    pending.append(executor.submit(fetch_chunk, next_record))
+                
+                decrypted_hashes.append(compute_hash(decrypted_chunk))
+                yield decrypted_chunk
         
         # Verify Merkle root
         computed_merkle = compute_merkle_root(decrypted_hashes)
@@ -800,43 +830,22 @@ def network_peers():
 # Node Software Download
 # =============================================================================
 
+NODE_PACKAGE_DIR = Path(__file__).parent.parent / "node_package"
+NODE_PACKAGE_ZIP = DATA_DIR / "decentra-node.zip"
+
+
 @app.route("/download-node", methods=["GET"])
 def download_node_software():
     """
     Download the standalone node software package.
     Returns a zip file with everything needed to run a storage node.
     """
-    import zipfile
-    import io
-    
-    # Create in-memory zip
-    zip_buffer = io.BytesIO()
-    node_package_dir = Path(__file__).parent.parent / "node_package"
-    
-    with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zf:
-        # Add all files from node_package directory
-        if node_package_dir.exists():
-            for file_path in node_package_dir.iterdir():
-                if file_path.is_file():
-                    zf.write(file_path, f"decentra-node/{file_path.name}")
-        else:
-            # Fallback: Create minimal package inline
-            storage_node_code = '''#!/usr/bin/env python3
-"""DecentraStore Storage Node - Standalone"""
-# Download the full package from the website
-print("Error: Please download the complete node package from the website.")
-'''
-            zf.writestr("decentra-node/storage_node.py", storage_node_code)
-            zf.writestr("decentra-node/README.md", "Download the full package from the website.")
-    
-    zip_buffer.seek(0)
-    
-    return Response(
-        zip_buffer.getvalue(),
+    zip_path = package_zip.build_node_package_zip(NODE_PACKAGE_DIR, NODE_PACKAGE_ZIP)
+    return send_from_directory(
+        str(zip_path.parent), zip_path.name,
         mimetype="application/zip",
-        headers={
-            "Content-Disposition": "attachment; filename=decentra-node.zip"
-        }
+        as_attachment=True,
+        download_name="decentra-node.zip"
     )
 
 
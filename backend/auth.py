@@ -12,7 +12,12 @@ Drop this file in `backend/` (replace/merge with your existing auth.py).
 
 import os
 import functools
+import hashlib
+import hmac
 import logging
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from typing import Optional, Tuple
 
@@ -29,6 +34,14 @@ logger = logging.getLogger(__name__)
 
 auth_bp = Blueprint("auth", __name__)
 
+# Derived encryption keys, cached briefly so repeated uploads/downloads in one
+# session don't pay the full KDF cost every time
+KDF_CACHE_TTL = 300  # seconds
+KDF_CACHE_MAX = 1024
+_kdf_cache = OrderedDict()  # (user_id, password HMAC) -> (expires_at, key)
+_KDF_CACHE_SECRET = SECRET_KEY.encode("utf-8")
+_kdf_cache_lock = threading.Lock()
+
 # -------------------------
 # Utility / core functions
 # -------------------------
@@ -226,12 +239,42 @@ def login_user(username: str, password: str) -> Tuple[Optional[str], Optional[Us
 def get_user_encryption_key(user: User, password: str) -> bytes:
     """
     Derive the user's encryption key from their password.
+
+    Results are cached for KDF_CACHE_TTL seconds per (user, password, salt);
+    the password itself is never stored, only an HMAC of it under the server
+    secret, so the cache can't be brute-forced with the salt from the database.
     """
     salt = b64_decode(user.key_salt)
+    cache_key = (
+        str(user.id),
+        hmac.new(_KDF_CACHE_SECRET, salt + password.encode("utf-8"), hashlib.sha256).digest(),
+    )
+    now = time.monotonic()
+
+    with _kdf_cache_lock:
+        entry = _kdf_cache.get(cache_key)
+        if entry and entry[0] > now:
+            _kdf_cache.move_to_end(cache_key)
+            return entry[1]
+
     key, _ = derive_key_from_password(password, salt)
+
+    with _kdf_cache_lock:
+        _kdf_cache[cache_key] = (now + KDF_CACHE_TTL, key)
+        _kdf_cache.move_to_end(cache_key)
+        while len(_kdf_cache) > KDF_CACHE_MAX:
+            _kdf_cache.popitem(last=False)
     return key
 
 
+def forget_user_keys(user_id) -> None:
+    """Drop any cached encryption keys for a user (logout, password change)."""
+    user_id = str(user_id)
+    with _kdf_cache_lock:
+        for cache_key in [k for k in _kdf_cache if k[0] == user_id]:
+            del _kdf_cache[cache_key]
+
+
 def change_password(user: User, old_password: str, new_password: str) -> Tuple[bool, Optional[str]]:
     """
     Change user's password.
@@ -257,6 +300,9 @@ def change_password(user: User, old_password: str, new_password: str) -> Tuple[b
         session.merge(u)
         session.commit()
 
+        # Keys derived from the old password/salt must not outlive it
+        forget_user_keys(u.id)
+
         return True, None
 
     except Exception as e:
@@ -11,8 +11,9 @@ Handles:
 
 import time
 import logging
+import threading
 from concurrent.futures import ThreadPoolExecutor, as_completed, wait
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Set
 from pathlib import Path
 
 import requests
@@ -38,10 +39,11 @@ MEASURE_MAX_WORKERS = 16
 UPLOAD_MAX_WORKERS = 8
 UPLOAD_RETRIES = 2
 BACKOFF_BASE = 0.5
+POOL_SIZE = 64  # Keep-alive connections per peer host
 
 
 def _make_session(retries: int = 2, backoff_factor: float = 1.0) -> requests.Session:
-    """Create a requests Session with retry policy."""
+    """Create a requests Session with retry policy and a keep-alive pool."""
     session = requests.Session()
     
     retry_kwargs = {
@@ -56,13 +58,58 @@ def _make_session(retries: int = 2, backoff_factor: float = 1.0) -> requests.Ses
     except TypeError:
         retry = Retry(**retry_kwargs, method_whitelist=frozenset(["GET", "POST", "HEAD"]))
     
-    adapter = HTTPAdapter(max_retries=retry)
+    adapter = HTTPAdapter(max_retries=retry, pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
     session.mount("http://", adapter)
     session.mount("https://", adapter)
     
     return session
 
 
+# Sessions are shared per retry policy so connections to peers are reused
+# across chunks and requests instead of reconnecting every time
+_SESSIONS: Dict[tuple, requests.Session] = {}
+_SESSIONS_LOCK = threading.Lock()
+
+
+def _get_session(retries: int = 2, backoff_factor: float = 1.0) -> requests.Session:
+    """Return the shared Session for a retry policy, creating it on first use."""
+    key = (retries, backoff_factor)
+    session = _SESSIONS.get(key)
+    if session is None:
+        with _SESSIONS_LOCK:
+            session = _SESSIONS.get(key)
+            if session is None:
+                session = _SESSIONS[key] = _make_session(retries, backoff_factor)
+    return session
+
+
+# Peers (ip, port) that only accept the older multipart /store form; found
+# when a raw-body upload is refused and the multipart retry succeeds
+_MULTIPART_PEERS: Set[tuple] = set()
+
+
+def _post_chunk(session: requests.Session, url: str, chunk_data: bytes,
+                chunk_hash: str, multipart: bool, timeout) -> requests.Response:
+    """POST a chunk to a node's /store, as a raw body or as the multipart form."""
+    if multipart:
+        return session.post(
+            url,
+            files={"file": (chunk_hash, chunk_data)},
+            data={"chunk_hash": chunk_hash},
+            timeout=timeout
+        )
+    # Send the raw bytes; the hash travels in a header
+    return session.post(
+        url,
+        data=chunk_data,
+        headers={
+            "Content-Type": "application/octet-stream",
+            "X-Chunk-Hash": chunk_hash,
+        },
+        timeout=timeout
+    )
+
+
 def get_peers(discovery_url: str = None, limit: int = CANDIDATE_LIMIT) -> List[Dict]:
     """
     Query discovery service for available peers.
@@ -75,7 +122,7 @@ def get_peers(discovery_url: str = None, limit: int = CANDIDATE_LIMIT) -> List[D
         return []
     
     try:
-        session = _make_session(retries=1)
+        session = _get_session(retries=1)
         resp = session.get(
             f"{url.rstrip('/')}/peers",
             params={"limit": limit},
@@ -107,7 +154,7 @@ def measure_rtt(peer: Dict) -> float:
     url = f"http://{ip}:{port}/health"
     
     try:
-        session = _make_session(retries=0)
+        session = _get_session(retries=0)
         start = time.time()
         resp = session.get(url, timeout=HEAD_TIMEOUT)
         rtt = time.time() - start
@@ -203,18 +250,22 @@ def upload_chunk_to_peer(
         return result
     
     url = f"http://{ip}:{port}/store"
-    session = _make_session(retries=1, backoff_factor=1)
+    session = _get_session(retries=1, backoff_factor=1)
     
     start_time = time.time()
     attempt = 0
     
     while attempt <= retries:
         try:
-            # Send as multipart form
-            files = {"file": (chunk_hash, chunk_data)}
-            data = {"chunk_hash": chunk_hash}
-            
-            resp = session.post(url, files=files, data=data, timeout=timeout)
+            peer_key = (ip, port)
+            multipart = peer_key in _MULTIPART_PEERS
+            resp = _post_chunk(session, url, chunk_data, chunk_hash, multipart, timeout)
+            if not multipart and resp.status_code in (400, 415):
+                # Nodes predating raw-body support reject it as missing chunk
+                # data; retry with the multipart form they expect
+                resp = _post_chunk(session, url, chunk_data, chunk_hash, True, timeout)
+                if resp.ok:
+                    _MULTIPART_PEERS.add(peer_key)
             resp.raise_for_status()
             
             result["status"] = "ok"
@@ -322,7 +373,7 @@ def fetch_chunk_from_peer(peer: Dict, chunk_hash: str, timeout: int = PEER_TIMEO
     
     url = f"http://{ip}:{port}/retrieve/{chunk_hash}"
     
-    session = _make_session(retries=1, backoff_factor=1)
+    session = _get_session(retries=1, backoff_factor=1)
     resp = session.get(url, timeout=timeout)
     resp.raise_for_status()
     
@@ -359,7 +410,7 @@ def fetch_chunk(
             node_id = a.get("node_id")
             if node_id:
                 try:
-                    session = _make_session(retries=0)
+                    session = _get_session(retries=0)
                     resp = session.get(
                         f"{discovery_url.rstrip('/')}/peer/{node_id}",
                         timeout=DISCOVERY_TIMEOUT
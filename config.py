@@ -14,6 +14,7 @@ Optional environment variables:
   - JWT_EXPIRY_HOURS: JWT token expiry in hours (default: 24)
   - REPLICATION: Number of chunk copies across nodes (default: 3)
   - NODE_TTL: Seconds before node considered offline (default: 60)
+  - UPLOAD_CONCURRENCY: Chunk transfers to nodes in flight at once (default: 32)
 """
 
 import os
@@ -43,6 +44,9 @@ PEER_TIMEOUT = float(os.environ.get("PEER_TIMEOUT", 10.0))
 DISCOVERY_TIMEOUT = float(os.environ.get("DISCOVERY_TIMEOUT", 5.0))
 UPLOAD_TIMEOUT = float(os.environ.get("UPLOAD_TIMEOUT", 30.0))
 
+# Chunk store/retrieve requests the server sends to nodes concurrently
+UPLOAD_CONCURRENCY = int(os.environ.get("UPLOAD_CONCURRENCY", 32))
+
 # Node settings
 NODE_HEARTBEAT_INTERVAL = int(os.environ.get("NODE_HEARTBEAT_INTERVAL", 15))  # seconds
 NODE_TTL = int(os.environ.get("NODE_TTL", 60))  # seconds before node considered dead
@@ -24,6 +24,7 @@ import sys
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 from config import NODE_TTL
+from shared import json_provider
 
 # Configure logging
 logging.basicConfig(
@@ -33,6 +34,7 @@ logging.basicConfig(
 LOG = logging.getLogger("discovery")
 
 app = Flask(__name__)
+json_provider.install(app)
 CORS(app)
 
 # In-memory peer registry
@@ -228,11 +228,17 @@ def count_stored_chunks() -> tuple:
     total_bytes = 0
     
     try:
-        for subdir in STORAGE_DIR.iterdir():
-            if subdir.is_dir():
-                for chunk_file in subdir.glob("*.chunk"):
-                    count += 1
-                    total_bytes += chunk_file.stat().st_size
+        # scandir entries carry their type (and usually their stat) from
+        # the directory read, so this is one syscall per chunk, not two
+        with os.scandir(STORAGE_DIR) as subdirs:
+            for subdir in subdirs:
+                if not subdir.is_dir():
+                    continue
+                with os.scandir(subdir.path) as entries:
+                    for entry in entries:
+                        if entry.name.endswith(".chunk") and entry.is_file(follow_symlinks=False):
+                            count += 1
+                            total_bytes += entry.stat(follow_symlinks=False).st_size
     except Exception:
         pass
     
@@ -280,24 +286,32 @@ def store_chunk():
     """
     Store an encrypted chunk.
     
-    Expects multipart form with:
+    Preferred: raw body with Content-Type application/octet-stream and
+    the expected SHA-256 in the X-Chunk-Hash header.
+    
+    Also accepts multipart form with:
     - file: The chunk binary data
     - chunk_hash: Expected SHA-256 hash (for verification)
     
-    Or JSON with:
+    Or JSON with (deprecated):
     - data: Base64-encoded chunk data
     - chunk_hash: Expected SHA-256 hash
     """
     chunk_data = None
     expected_hash = None
     
+    # Handle raw binary body
+    if request.mimetype == "application/octet-stream":
+        chunk_data = request.get_data()
+        expected_hash = request.headers.get("X-Chunk-Hash")
+    
     # Handle multipart file upload
-    if "file" in request.files:
+    elif "file" in request.files:
         file = request.files["file"]
         chunk_data = file.read()
         expected_hash = request.form.get("chunk_hash") or request.form.get("file_hash")
     
-    # Handle JSON payload
+    # Handle JSON payload (deprecated, base64 overhead)
     elif request.is_json:
         import base64
         json_data = request.get_json()
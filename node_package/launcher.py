@@ -7,43 +7,74 @@ Interactive GUI for easy node setup - now with WebSocket (NAT-friendly)!
 import os
 import sys
 import json
+import hashlib
 import subprocess
 import socket
 from pathlib import Path
 
-# Config file location
-CONFIG_DIR = Path.home() / ".decentrastore"
+# Config file location (home is resolved once; it can be slow on Windows)
+HOME = Path.home()
+CONFIG_DIR = HOME / ".decentrastore"
 CONFIG_FILE = CONFIG_DIR / "node_config.json"
+# Packages check_dependencies installs (keep in step with requirements.txt)
+NODE_DEPENDENCIES = ["python-socketio[client]", "websocket-client"]
+# Written once dependencies are known to import. Named after the interpreter,
+# its environment and the dependency list, so another Python or venv (or a
+# changed list) never reuses it
+DEPS_MARKER = CONFIG_DIR / (".deps_" + hashlib.sha256(
+    "\0".join([sys.executable, sys.prefix, *NODE_DEPENDENCIES]).encode("utf-8")
+).hexdigest()[:16])
 
 DEFAULT_CONFIG = {
     "server_url": "",
-    "storage_dir": str(Path.home() / "DecentraStore" / "chunks"),
+    "storage_dir": str(HOME / "DecentraStore" / "chunks"),
     "node_id": "",
     "capacity_gb": 10
 }
 
 
+# Parsed config, reused while the file's mtime is unchanged
+_CONFIG_CACHE = None
+_CACHE_MTIME = None
+
+
 def load_config():
     """Load saved configuration."""
-    if CONFIG_FILE.exists():
-        try:
-            with open(CONFIG_FILE, "r") as f:
-                saved = json.load(f)
-                # Migrate old config format
-                if "discovery_url" in saved and "server_url" not in saved:
-                    saved["server_url"] = saved["discovery_url"]
-                return {**DEFAULT_CONFIG, **saved}
-        except:
-            pass
+    global _CONFIG_CACHE, _CACHE_MTIME
+
+    try:
+        mtime = CONFIG_FILE.stat().st_mtime
+    except OSError:
+        return DEFAULT_CONFIG.copy()
+
+    if _CONFIG_CACHE is not None and mtime == _CACHE_MTIME:
+        return dict(_CONFIG_CACHE)
+
+    try:
+        with open(CONFIG_FILE, "r") as f:
+            saved = json.load(f)
+            # Migrate old config format
+            if "discovery_url" in saved and "server_url" not in saved:
+                saved["server_url"] = saved["discovery_url"]
+            _CONFIG_CACHE = {**DEFAULT_CONFIG, **saved}
+            _CACHE_MTIME = mtime
+            return dict(_CONFIG_CACHE)
+    except:
+        pass
     return DEFAULT_CONFIG.copy()
 
 
 def save_config(config):
     """Save configuration."""
+    global _CONFIG_CACHE, _CACHE_MTIME
+
     CONFIG_DIR.mkdir(parents=True, exist_ok=True)
     with open(CONFIG_FILE, "w") as f:
         json.dump(config, f, indent=2)
 
+    _CONFIG_CACHE = {**DEFAULT_CONFIG, **config}
+    _CACHE_MTIME = CONFIG_FILE.stat().st_mtime
+
 
 def get_computer_name():
     """Get computer name for node ID."""
@@ -52,14 +83,34 @@ def get_computer_name():
 
 def check_dependencies():
     """Check and install dependencies."""
+    # A marker newer than the interpreter means a previous run already
+    # imported them; one stat is much cheaper than importing socketio.
+    try:
+        if DEPS_MARKER.stat().st_mtime > Path(sys.executable).stat().st_mtime:
+            return True
+    except OSError:
+        pass
+
     try:
         import socketio
-        return True
     except ImportError:
         print("Installing dependencies...")
         subprocess.check_call([sys.executable, "-m", "pip", "install",
-                              "python-socketio[client]", "websocket-client", "-q"])
+                              *NODE_DEPENDENCIES, "-q"])
+
+    try:
+        CONFIG_DIR.mkdir(parents=True, exist_ok=True)
+        DEPS_MARKER.touch()
+    except OSError:
+        pass
+    return True
+
+
+def has_display():
+    """Check whether a graphical display is likely available."""
+    if sys.platform in ("win32", "darwin"):
         return True
+    return bool(os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
 
 
 def run_gui():
@@ -72,8 +123,10 @@ def run_gui():
 
     config = load_config()
 
-    # Create window
+    # Create window (hidden until all widgets are packed, so the
+    # geometry manager runs a single layout pass instead of one per widget)
     root = tk.Tk()
+    root.withdraw()
     root.title("DecentraStore Node Setup")
     root.geometry("520x480")
     root.resizable(False, False)
@@ -204,6 +257,8 @@ Get the server URL from the DecentraStore dashboard.
     info_label = ttk.Label(main_frame, text=info_text, foreground="gray", justify="left")
     info_label.pack(pady=10)
 
+    root.update_idletasks()
+    root.deiconify()
     root.mainloop()
     return True
 
@@ -232,7 +287,7 @@ def run_cli():
         server_url = "https://" + server_url
 
     # Storage
-    default_storage = config.get("storage_dir", str(Path.home() / "DecentraStore" / "chunks"))
+    default_storage = config.get("storage_dir", DEFAULT_CONFIG["storage_dir"])
     storage_dir = input(f"Storage Directory [{default_storage}]: ").strip() or default_storage
 
     # Node ID
@@ -297,10 +352,26 @@ def run_node(server_url, storage_dir, node_id, capacity):
         "--capacity", str(capacity)
     ]
 
+    # Hand the process over to the node instead of keeping the launcher
+    # interpreter resident just to wait on it.
+    sys.stdout.flush()
+    if os.name == "posix":
+        # Same PID and terminal, so Ctrl+C reaches the node directly
+        os.execv(sys.executable, cmd)
+
     try:
-        subprocess.run(cmd)
-    except KeyboardInterrupt:
-        print("\nNode stopped.")
+        # CREATE_NEW_CONSOLE and DETACHED_PROCESS are mutually exclusive;
+        # the node needs a console for its output and Ctrl+C handling.
+        subprocess.Popen(cmd, creationflags=subprocess.CREATE_NEW_CONSOLE,
+                         close_fds=True)
+    except (AttributeError, OSError):
+        # Fall back to waiting on the child in this console
+        try:
+            subprocess.run(cmd)
+        except KeyboardInterrupt:
+            print("\nNode stopped.")
+        return
+    sys.exit(0)
 
 
 def main():
@@ -315,6 +386,12 @@ def main():
         run_cli()
         return
 
+    # Headless: skip the tkinter import and display probe entirely
+    if not has_display():
+        print("No display found, using command line...")
+        run_cli()
+        return
+
     # Try GUI first, fall back to CLI
     if not run_gui():
         print("GUI not available, using command line...")
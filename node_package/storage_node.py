@@ -12,28 +12,67 @@ Usage:
 import os
 import sys
 import time
+import json
 import uuid
 import hashlib
 import threading
 import signal
+import atexit
 import logging
+import logging.handlers
+import queue
 import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from typing import Optional
 
-# Check dependencies
-try:
-    import requests
-    from flask import Flask, request, jsonify, send_file
-    from flask_cors import CORS
-except ImportError:
-    print("Missing dependencies! Installing...")
-    import subprocess
-    subprocess.check_call([sys.executable, "-m", "pip", "install", 
-                          "flask", "flask-cors", "requests", "-q"])
-    import requests
-    from flask import Flask, request, jsonify, send_file
-    from flask_cors import CORS
+# Heavy dependencies, bound by _lazy_imports() so that --help and argument
+# errors don't pay for importing Flask and requests
+requests = None
+Flask = request = jsonify = send_file = CORS = None
+
+
+def _lazy_imports():
+    """Import (and if needed install) flask and requests."""
+    global requests, Flask, request, jsonify, send_file, CORS
+    if Flask is not None:
+        return
+    
+    # Check dependencies
+    try:
+        import requests
+        from flask import Flask, request, jsonify, send_file
+        from flask_cors import CORS
+    except ImportError:
+        print("Missing dependencies! Installing...")
+        import subprocess
+        subprocess.check_call([sys.executable, "-m", "pip", "install", 
+                              "flask", "flask-cors", "requests", "-q"])
+        import requests
+        from flask import Flask, request, jsonify, send_file
+        from flask_cors import CORS
+
+
+def _orjson_provider():
+    """Return an orjson-backed Flask JSON provider class, or None."""
+    try:
+        import orjson
+        from flask.json.provider import DefaultJSONProvider
+    except ImportError:
+        return None
+    
+    class OrjsonProvider(DefaultJSONProvider):
+        """Flask JSON provider that encodes/decodes with orjson."""
+        
+        def dumps(self, obj, **kwargs):
+            return orjson.dumps(obj, default=self.default,
+                                option=orjson.OPT_NON_STR_KEYS).decode()
+        
+        def loads(self, s, **kwargs):
+            return orjson.loads(s)
+    
+    return OrjsonProvider
 
 
 # =============================================================================
@@ -50,30 +89,69 @@ DEFAULT_CONFIG = {
     "node_ttl": 60,  # seconds
 }
 
+# Upload bodies are hashed and written in blocks of this size
+STREAM_BLOCK_SIZE = 1024 * 1024  # 1 MiB
+
 
 # =============================================================================
 # Logging
 # =============================================================================
 
+# Request threads only enqueue records; LOG_LISTENER (started in main())
+# formats and writes them from a background thread
+_LOG_QUEUE = queue.SimpleQueue()
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(logging.Formatter("%(asctime)s [NODE] %(levelname)s: %(message)s"))
+LOG_LISTENER = logging.handlers.QueueListener(_LOG_QUEUE, _log_handler)
+
 logging.basicConfig(
     level=logging.INFO,
-    format="%(asctime)s [NODE] %(levelname)s: %(message)s"
+    format="%(message)s",  # QueueHandler pre-renders just the message
+    handlers=[logging.handlers.QueueHandler(_LOG_QUEUE)]
 )
 LOG = logging.getLogger("storage_node")
 
+# No per-request access log lines
+logging.getLogger("werkzeug").setLevel(logging.WARNING)
+
 
 # =============================================================================
 # Flask App
 # =============================================================================
 
-app = Flask(__name__)
-CORS(app)
+app = None
+
+# (rule, view, options) collected by @route, registered in create_app()
+ROUTES = []
+
+
+def route(rule: str, **options):
+    """Record a view to be registered once Flask is imported."""
+    def decorator(view):
+        ROUTES.append((rule, view, options))
+        return view
+    return decorator
+
+
+def create_app():
+    """Build the Flask app with all routes registered."""
+    _lazy_imports()
+    flask_app = Flask(__name__)
+    CORS(flask_app)
+    provider = _orjson_provider()
+    if provider is not None:
+        flask_app.json = provider(flask_app)
+    for rule, view, options in ROUTES:
+        flask_app.add_url_rule(rule, view_func=view, **options)
+    return flask_app
 
 # Runtime state
 NODE_ID: str = None
 NODE_HOST: str = None
 NODE_PORT: int = None
 STORAGE_DIR: Path = None
+_STORAGE_STR: str = None  # str(STORAGE_DIR), for building chunk paths
+TMP_DIR: Path = None  # In-flight uploads, same filesystem as STORAGE_DIR
 DISCOVERY_URL: str = None
 HEARTBEAT_INTERVAL: int = 15
 
@@ -84,75 +162,336 @@ STATS = {
     "bytes_served": 0,
     "started_at": None,
 }
+STATS_LOCK = threading.Lock()
+
+# Raw 32-byte digests of every stored chunk, so existence checks skip the
+# filesystem. Guarded by STATS_LOCK together with the counters.
+CHUNK_INDEX = set()
+# Digests claimed by uploads that are still being committed. Kept apart from
+# CHUNK_INDEX so a rescan replacing the index can't drop a claim.
+PENDING_CHUNKS = set()
+# Digests committed while a rescan walks storage (None when not rescanning);
+# the walk may have passed their directory already
+_scan_commits = None
+
+# Full storage walk to correct counter drift (seconds)
+RESCAN_INTERVAL = 300
 
 SHUTDOWN_EVENT = threading.Event()
 
+# Fixed part of the /health body, built once NODE_ID is known
+_HEALTH_PREFIX: bytes = None
+
+# Keep-alive sessions, created in main(): one for discovery, one for the
+# external IP services (different hosts, separate pools)
+DISCOVERY_SESSION = None
+IP_SESSION = None
+
 
 # =============================================================================
 # Helper Functions
 # =============================================================================
 
-def get_external_ip() -> Optional[str]:
-    """Try to get external IP address."""
-    services = [
-        "https://api.ipify.org",
-        "https://icanhazip.com",
-        "https://ifconfig.me/ip",
-    ]
-    for svc in services:
-        try:
-            resp = requests.get(svc, timeout=5)
-            if resp.status_code == 200:
-                return resp.text.strip()
-        except:
-            continue
+def _make_session(retries: int = 3, backoff_factor: float = 0.5):
+    """Create a pooled requests Session with retry policy."""
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+    
+    session = requests.Session()
+    session.headers["Connection"] = "keep-alive"
+    
+    retry_kwargs = {
+        "total": retries,
+        "backoff_factor": backoff_factor,
+        "status_forcelist": [500, 502, 503, 504],
+    }
+    
+    # Handle different urllib3 versions
+    try:
+        retry = Retry(**retry_kwargs, allowed_methods=frozenset(["GET", "POST"]))
+    except TypeError:
+        retry = Retry(**retry_kwargs, method_whitelist=frozenset(["GET", "POST"]))
+    
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=4, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+EXTERNAL_IP_SERVICES = [
+    "https://api.ipify.org",
+    "https://icanhazip.com",
+    "https://ifconfig.me/ip",
+]
+EXTERNAL_IP_TTL = 600  # seconds; public IPs rarely change
+_EXT_IP_CACHE = {"ip": None, "expires": 0.0}
+
+
+def _probe_external_ip(svc: str) -> Optional[str]:
+    """Ask one service for our external IP."""
+    try:
+        resp = IP_SESSION.get(svc, timeout=2)
+        if resp.status_code == 200:
+            return resp.text.strip() or None
+    except:
+        pass
     return None
 
 
+def get_external_ip() -> Optional[str]:
+    """Try to get external IP address (cached, services queried in parallel)."""
+    now = time.monotonic()
+    if _EXT_IP_CACHE["ip"] and now < _EXT_IP_CACHE["expires"]:
+        return _EXT_IP_CACHE["ip"]
+    
+    ip = None
+    executor = ThreadPoolExecutor(max_workers=len(EXTERNAL_IP_SERVICES))
+    try:
+        futures = [executor.submit(_probe_external_ip, svc) for svc in EXTERNAL_IP_SERVICES]
+        for future in as_completed(futures):
+            ip = future.result()
+            if ip:
+                break
+    finally:
+        # Don't wait on the slower probes once one has answered
+        executor.shutdown(wait=False, cancel_futures=True)
+    
+    if ip:
+        _EXT_IP_CACHE.update(ip=ip, expires=now + EXTERNAL_IP_TTL)
+    return ip
+
+
 def compute_hash(data: bytes) -> str:
     """Compute SHA-256 hash."""
     return hashlib.sha256(data).hexdigest()
 
 
-def get_chunk_path(chunk_hash: str) -> Path:
-    """Get file path for a chunk (uses subdirectories)."""
-    subdir = chunk_hash[:2]
-    chunk_dir = STORAGE_DIR / subdir
-    chunk_dir.mkdir(parents=True, exist_ok=True)
-    return chunk_dir / f"{chunk_hash}.chunk"
+def parse_chunk_hash(chunk_hash: str) -> Optional[bytes]:
+    """Decode a hex SHA-256 to its 32 raw bytes, or None if malformed."""
+    try:
+        raw = bytes.fromhex(chunk_hash)
+    except ValueError:
+        return None
+    return raw if len(raw) == 32 else None
 
 
-def get_storage_capacity_gb() -> float:
-    """Get available storage in GB."""
+# Linux only; 0 elsewhere or when probe_tmpfile() finds it unusable
+_O_TMPFILE = getattr(os, "O_TMPFILE", 0)
+
+
+def probe_tmpfile():
+    """Disable O_TMPFILE unless an unnamed file in TMP_DIR can be linked."""
+    global _O_TMPFILE
+    if not _O_TMPFILE:
+        return
+    probe = TMP_DIR / f".probe-{os.getpid()}"
     try:
-        if sys.platform == "win32":
-            import ctypes
-            free_bytes = ctypes.c_ulonglong(0)
-            ctypes.windll.kernel32.GetDiskFreeSpaceExW(
-                ctypes.c_wchar_p(str(STORAGE_DIR)),
-                None, None, ctypes.pointer(free_bytes)
-            )
-            return round(free_bytes.value / (1024**3), 2)
-        else:
-            stat = os.statvfs(STORAGE_DIR)
-            return round((stat.f_bavail * stat.f_frsize) / (1024**3), 2)
-    except:
-        return 0
+        fd = os.open(TMP_DIR, _O_TMPFILE | os.O_WRONLY, 0o644)
+        try:
+            os.link(f"/proc/self/fd/{fd}", probe)
+        finally:
+            os.close(fd)
+        probe.unlink()
+    except OSError:
+        _O_TMPFILE = 0
 
 
-def count_chunks() -> tuple:
-    """Count stored chunks and total bytes."""
+class TempChunk:
+    """
+    An upload being written under TMP_DIR.
+    
+    Uses an unnamed O_TMPFILE where supported (nothing is left behind if
+    the node dies mid-upload) and a named .part file otherwise. Writes go
+    straight to the fd with os.write, skipping the buffered file layer.
+    """
+    
+    def __init__(self):
+        self.fd = None
+        self.path = None
+        if _O_TMPFILE:
+            try:
+                self.fd = os.open(TMP_DIR, _O_TMPFILE | os.O_WRONLY, 0o644)
+            except OSError:
+                pass  # Filesystem without O_TMPFILE support
+        if self.fd is None:
+            self.fd, self.path = tempfile.mkstemp(dir=TMP_DIR, suffix=".part")
+    
+    def write(self, data: bytes):
+        view = memoryview(data)
+        while view:
+            view = view[os.write(self.fd, view):]
+    
+    def commit(self, dest: str):
+        """Give the file its final name and close it."""
+        fd, self.fd = self.fd, None
+        try:
+            if hasattr(os, "posix_fadvise"):
+                # Write-once data; keep it from crowding out the page cache
+                try:
+                    os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+                except OSError:
+                    pass
+            if self.path is None:
+                try:
+                    os.link(f"/proc/self/fd/{fd}", dest)
+                except FileExistsError:
+                    pass  # Same name means same content
+        finally:
+            os.close(fd)
+        
+        # Named files are renamed after closing (Windows can't rename open files)
+        if self.path is not None:
+            os.replace(self.path, dest)
+            self.path = None
+    
+    def discard(self):
+        """Close and remove the file if it was not committed."""
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+        if self.path is not None:
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+            self.path = None
+
+
+def write_chunk_stream(stream) -> tuple:
+    """
+    Copy a stream to a temp file, hashing it on the way.
+    
+    Returns (TempChunk, sha256_hex, size). The caller must commit or
+    discard the TempChunk.
+    """
+    hasher = hashlib.sha256()
+    size = 0
+    # One reusable buffer instead of a new bytes object per block
+    view = memoryview(bytearray(STREAM_BLOCK_SIZE))
+    readinto = getattr(stream, "readinto", None)
+    tmp = TempChunk()
+    try:
+        while True:
+            if readinto is not None:
+                n = readinto(view)
+                if not n:
+                    break
+                block = view[:n]
+            else:
+                block = stream.read(STREAM_BLOCK_SIZE)
+                if not block:
+                    break
+                n = len(block)
+            hasher.update(block)
+            tmp.write(block)
+            size += n
+    except BaseException:
+        tmp.discard()
+        raise
+    return tmp, hasher.hexdigest(), size
+
+
+def get_chunk_path(chunk_hash: str) -> str:
+    """Get file path for a chunk (subdirectories are created at startup)."""
+    # Plain string formatting; this runs on every store and retrieve
+    return f"{_STORAGE_STR}{os.sep}{chunk_hash[:2]}{os.sep}{chunk_hash}.chunk"
+
+
+# Free space only changes as we (or others) write; re-query at most this often
+CAPACITY_TTL = 30  # seconds
+_CAPACITY_CACHE = {"free_bytes": 0, "expires": 0.0}
+
+
+def _query_free_bytes() -> int:
+    """Ask the OS for free bytes on the storage volume."""
+    if sys.platform == "win32":
+        import ctypes
+        free_bytes = ctypes.c_ulonglong(0)
+        ctypes.windll.kernel32.GetDiskFreeSpaceExW(
+            ctypes.c_wchar_p(str(STORAGE_DIR)),
+            None, None, ctypes.pointer(free_bytes)
+        )
+        return free_bytes.value
+    stat = os.statvfs(STORAGE_DIR)
+    return stat.f_bavail * stat.f_frsize
+
+
+def get_storage_capacity_gb() -> float:
+    """Get available storage in GB (cached for CAPACITY_TTL seconds)."""
+    now = time.monotonic()
+    if now >= _CAPACITY_CACHE["expires"]:
+        try:
+            free_bytes = _query_free_bytes()
+        except:
+            return 0
+        _CAPACITY_CACHE.update(free_bytes=free_bytes, expires=now + CAPACITY_TTL)
+    return round(_CAPACITY_CACHE["free_bytes"] / (1024**3), 2)
+
+
+def note_bytes_written(size: int):
+    """Keep the cached free space roughly right between refreshes."""
+    _CAPACITY_CACHE["free_bytes"] = max(0, _CAPACITY_CACHE["free_bytes"] - size)
+
+
+# Threads used to walk the shard directories (latency-bound, not CPU-bound)
+SCAN_WORKERS = 16
+
+
+def _scan_subdir(path: str) -> tuple:
+    """Scan one shard directory; return (count, bytes, set of hashes)."""
     count = 0
     total_bytes = 0
+    hashes = set()
     try:
-        for subdir in STORAGE_DIR.iterdir():
-            if subdir.is_dir():
-                for chunk in subdir.glob("*.chunk"):
-                    count += 1
-                    total_bytes += chunk.stat().st_size
-    except:
+        with os.scandir(path) as it:
+            for entry in it:
+                if not entry.name.endswith(".chunk"):
+                    continue
+                raw = parse_chunk_hash(entry.name[:-6])
+                if raw is None:
+                    continue
+                count += 1
+                total_bytes += entry.stat().st_size
+                hashes.add(raw)
+    except OSError:
         pass
-    return count, total_bytes
+    return count, total_bytes, hashes
+
+
+def scan_chunks() -> tuple:
+    """Walk storage; return (chunk count, total bytes, set of hashes)."""
+    count = 0
+    total_bytes = 0
+    hashes = set()
+    subdirs = [os.path.join(STORAGE_DIR, f"{i:02x}") for i in range(256)]
+    with ThreadPoolExecutor(max_workers=SCAN_WORKERS) as executor:
+        for sub_count, sub_bytes, sub_hashes in executor.map(_scan_subdir, subdirs):
+            count += sub_count
+            total_bytes += sub_bytes
+            hashes |= sub_hashes
+    return count, total_bytes, hashes
+
+
+def refresh_chunk_stats():
+    """Reset the cached chunk counters and index from a full storage walk."""
+    global CHUNK_INDEX, _scan_commits
+    with STATS_LOCK:
+        _scan_commits = set()
+    count, total_bytes, hashes = scan_chunks()
+    with STATS_LOCK:
+        STATS["chunks_stored"] = count
+        STATS["bytes_stored"] = total_bytes
+        # Swap in a complete set with one assignment; existence checks read
+        # the index without the lock and must never see it half rebuilt
+        hashes |= _scan_commits
+        CHUNK_INDEX = hashes
+        _scan_commits = None
+
+
+def count_chunks() -> tuple:
+    """Stored chunks and total bytes, from the cached counters."""
+    with STATS_LOCK:
+        return STATS["chunks_stored"], STATS["bytes_stored"]
 
 
 # =============================================================================
@@ -176,15 +515,15 @@ def register_with_discovery():
             "meta": {"version": "1.0.0", "standalone": True}
         }
         
-        resp = requests.post(f"{DISCOVERY_URL}/register", json=payload, timeout=10)
+        resp = DISCOVERY_SESSION.post(f"{DISCOVERY_URL}/register", json=payload, timeout=10)
         if resp.status_code == 200:
-            LOG.info(f"Registered with discovery: {resp.json().get('status')}")
+            LOG.info("Registered with discovery: %s", resp.json().get("status"))
             return True
         else:
-            LOG.error(f"Registration failed: {resp.status_code}")
+            LOG.error("Registration failed: %s", resp.status_code)
             return False
     except Exception as e:
-        LOG.error(f"Failed to register: {e}")
+        LOG.error("Failed to register: %s", e)
         return False
 
 
@@ -202,17 +541,24 @@ def send_heartbeat():
                 "bytes_stored": total_bytes,
             }
         }
-        resp = requests.post(f"{DISCOVERY_URL}/heartbeat", json=payload, timeout=5)
+        resp = DISCOVERY_SESSION.post(f"{DISCOVERY_URL}/heartbeat", json=payload, timeout=5)
         if resp.status_code == 404:
             LOG.warning("Not registered, re-registering...")
             register_with_discovery()
     except Exception as e:
-        LOG.error(f"Heartbeat failed: {e}")
+        LOG.error("Heartbeat failed: %s", e)
 
 
 def heartbeat_thread():
     """Background heartbeat thread."""
+    last_rescan = time.time()
     while not SHUTDOWN_EVENT.is_set():
+        if time.time() - last_rescan >= RESCAN_INTERVAL:
+            try:
+                refresh_chunk_stats()
+            except:
+                pass
+            last_rescan = time.time()
         try:
             send_heartbeat()
         except:
@@ -224,7 +570,7 @@ def unregister():
     """Unregister from discovery on shutdown."""
     if DISCOVERY_URL:
         try:
-            requests.post(f"{DISCOVERY_URL}/unregister", 
+            DISCOVERY_SESSION.post(f"{DISCOVERY_URL}/unregister", 
                          json={"node_id": NODE_ID}, timeout=5)
             LOG.info("Unregistered from discovery")
         except:
@@ -235,17 +581,17 @@ def unregister():
 # API Endpoints
 # =============================================================================
 
-@app.route("/health", methods=["GET"])
+@route("/health", methods=["GET"])
 def health():
     """Health check."""
-    return jsonify({
-        "status": "healthy",
-        "node_id": NODE_ID,
-        "timestamp": int(time.time()),
-    })
+    # Only the timestamp varies, so skip building and encoding a dict
+    return app.response_class(
+        _HEALTH_PREFIX + str(int(time.time())).encode() + b"}",
+        mimetype="application/json",
+    )
 
 
-@app.route("/stats", methods=["GET"])
+@route("/stats", methods=["GET"])
 def stats():
     """Node statistics."""
     chunk_count, total_bytes = count_chunks()
@@ -261,78 +607,146 @@ def stats():
     })
 
 
-@app.route("/store", methods=["POST"])
+@route("/store", methods=["POST"])
 def store_chunk():
     """Store an encrypted chunk."""
-    chunk_data = None
+    stream = None
     expected_hash = None
     
-    # Handle multipart upload
-    if "file" in request.files:
-        chunk_data = request.files["file"].read()
+    # Handle raw body (preferred: no multipart parsing, no base64)
+    if request.mimetype == "application/octet-stream":
+        stream = request.stream
+        expected_hash = request.headers.get("X-Chunk-Hash")
+    # Handle multipart upload. Werkzeug has already spooled the part (to
+    # memory for small bodies, a temp file for large ones) before this runs;
+    # we copy it from there. Clients wanting a single pass should send raw.
+    elif "file" in request.files:
+        stream = request.files["file"].stream
         expected_hash = request.form.get("chunk_hash")
-    # Handle JSON
+    # Handle JSON (deprecated: base64 inflates the body by a third and
+    # forces an extra decode copy; kept for older clients)
     elif request.is_json:
+        import io
         import base64
         data = request.get_json()
         if "data" in data:
-            chunk_data = base64.b64decode(data["data"])
+            stream = io.BytesIO(base64.b64decode(data["data"]))
         expected_hash = data.get("chunk_hash")
     
-    if not chunk_data:
+    if stream is None:
         return jsonify({"error": "No chunk data"}), 400
     
-    actual_hash = compute_hash(chunk_data)
-    
-    if expected_hash and actual_hash != expected_hash.lower():
-        return jsonify({"error": "hash_mismatch"}), 400
-    
-    chunk_path = get_chunk_path(actual_hash)
-    
-    if chunk_path.exists():
-        return jsonify({"status": "exists", "chunk_hash": actual_hash, "node_id": NODE_ID})
+    try:
+        tmp, actual_hash, size = write_chunk_stream(stream)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
     
     try:
-        with open(chunk_path, "wb") as f:
-            f.write(chunk_data)
+        if size == 0:
+            return jsonify({"error": "No chunk data"}), 400
         
-        STATS["chunks_stored"] += 1
-        STATS["bytes_stored"] += len(chunk_data)
-        LOG.info(f"Stored: {actual_hash[:16]}... ({len(chunk_data)} bytes)")
+        if expected_hash and actual_hash != expected_hash.lower():
+            return jsonify({"error": "hash_mismatch"}), 400
+        
+        # Claim the hash first so concurrent uploads of the same chunk
+        # don't both write and double-count it
+        key = bytes.fromhex(actual_hash)
+        with STATS_LOCK:
+            exists = key in CHUNK_INDEX or key in PENDING_CHUNKS
+            if not exists:
+                PENDING_CHUNKS.add(key)
+        
+        if exists:
+            return jsonify({"status": "exists", "chunk_hash": actual_hash, "node_id": NODE_ID})
+        
+        try:
+            tmp.commit(get_chunk_path(actual_hash))
+        except Exception:
+            with STATS_LOCK:
+                PENDING_CHUNKS.discard(key)
+            raise
+        
+        with STATS_LOCK:
+            PENDING_CHUNKS.discard(key)
+            CHUNK_INDEX.add(key)
+            if _scan_commits is not None:
+                _scan_commits.add(key)
+            STATS["chunks_stored"] += 1
+            STATS["bytes_stored"] += size
+            note_bytes_written(size)
+        LOG.info("Stored: %s... (%d bytes)", actual_hash[:16], size)
         
         return jsonify({"status": "stored", "chunk_hash": actual_hash, "node_id": NODE_ID})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+    finally:
+        tmp.discard()
 
 
-@app.route("/retrieve/<chunk_hash>", methods=["GET"])
+@route("/retrieve/<chunk_hash>", methods=["GET"])
 def retrieve_chunk(chunk_hash: str):
     """Retrieve a chunk by hash."""
-    chunk_hash = chunk_hash.lower()
-    
-    if len(chunk_hash) != 64:
+    raw = parse_chunk_hash(chunk_hash)
+    if raw is None:
         return jsonify({"error": "Invalid hash"}), 400
     
+    # Canonical lowercase hex; only hex digits can reach the path
+    chunk_hash = raw.hex()
     chunk_path = get_chunk_path(chunk_hash)
     
-    if not chunk_path.exists():
+    if not os.path.exists(chunk_path):
         return jsonify({"error": "Not found"}), 404
     
+    # Chunks are content-addressed, so the hash is a strong ETag and the
+    # body can never change
+    cache_headers = {
+        "ETag": f'"{chunk_hash}"',
+        "Cache-Control": "public, max-age=31536000, immutable",
+    }
+    if request.if_none_match.contains(chunk_hash):
+        return "", 304, cache_headers
+    
     try:
-        STATS["chunks_served"] += 1
-        return send_file(chunk_path, mimetype="application/octet-stream")
+        with STATS_LOCK:
+            STATS["chunks_served"] += 1
+        resp = send_file(chunk_path, mimetype="application/octet-stream", etag=False)
+        resp.headers.update(cache_headers)
+        return resp
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
-@app.route("/exists/<chunk_hash>", methods=["GET"])
+@route("/exists/<chunk_hash>", methods=["GET"])
 def chunk_exists(chunk_hash: str):
     """Check if chunk exists."""
-    chunk_path = get_chunk_path(chunk_hash.lower())
-    exists = chunk_path.exists()
+    raw = parse_chunk_hash(chunk_hash)
+    if raw is None:
+        return jsonify({"error": "Invalid hash"}), 400
+    exists = raw in CHUNK_INDEX
     return jsonify({"exists": exists, "chunk_hash": chunk_hash})
 
 
+@route("/exists_batch", methods=["POST"])
+def chunks_exist_batch():
+    """
+    Check many chunks in one request.
+    
+    Expects a JSON array of hex hashes. Returns application/octet-stream
+    with one byte per hash, in order: 1 if stored, 0 if not (or malformed).
+    """
+    hashes = request.get_json(silent=True)
+    if not isinstance(hashes, list):
+        return jsonify({"error": "Expected a JSON array of hashes"}), 400
+    
+    result = bytearray(len(hashes))
+    for i, chunk_hash in enumerate(hashes):
+        raw = parse_chunk_hash(chunk_hash) if isinstance(chunk_hash, str) else None
+        if raw is not None and raw in CHUNK_INDEX:
+            result[i] = 1
+    
+    return app.response_class(bytes(result), mimetype="application/octet-stream")
+
+
 # =============================================================================
 # Main
 # =============================================================================
@@ -342,11 +756,13 @@ def graceful_shutdown(signum, frame):
     LOG.info("Shutting down...")
     SHUTDOWN_EVENT.set()
     unregister()
+    DISCOVERY_SESSION.close()
+    IP_SESSION.close()
     sys.exit(0)
 
 
 def main():
-    global NODE_ID, NODE_HOST, NODE_PORT, STORAGE_DIR, DISCOVERY_URL, HEARTBEAT_INTERVAL
+    global app, _HEALTH_PREFIX, _STORAGE_STR, DISCOVERY_SESSION, IP_SESSION, NODE_ID, NODE_HOST, NODE_PORT, STORAGE_DIR, TMP_DIR, DISCOVERY_URL, HEARTBEAT_INTERVAL
     
     parser = argparse.ArgumentParser(description="DecentraStore Storage Node")
     parser.add_argument("--host", default="0.0.0.0", help="Bind host")
@@ -357,21 +773,44 @@ def main():
     
     args = parser.parse_args()
     
+    # Start the log writer; stopping it at exit flushes queued records
+    LOG_LISTENER.start()
+    atexit.register(LOG_LISTENER.stop)
+    
+    app = create_app()
+    DISCOVERY_SESSION = _make_session()
+    IP_SESSION = _make_session(retries=0)
+    
     # Set globals
     NODE_ID = args.node_id or f"node-{uuid.uuid4().hex[:8]}"
+    _HEALTH_PREFIX = ('{"status":"healthy","node_id":%s,"timestamp":'
+                      % json.dumps(NODE_ID)).encode()
     NODE_HOST = args.host
     NODE_PORT = args.port
     STORAGE_DIR = Path(args.storage_dir).resolve()
+    _STORAGE_STR = str(STORAGE_DIR)
     DISCOVERY_URL = args.discovery.rstrip("/")
     
-    # Create storage directory
+    # Create storage directory and all 256 shard subdirectories up front,
+    # so storing a chunk never needs a mkdir
     STORAGE_DIR.mkdir(parents=True, exist_ok=True)
+    for i in range(256):
+        (STORAGE_DIR / f"{i:02x}").mkdir(exist_ok=True)
+    
+    # Temp dir for in-flight uploads; anything left here is from a crash
+    TMP_DIR = STORAGE_DIR / ".tmp"
+    TMP_DIR.mkdir(exist_ok=True)
+    for leftover in TMP_DIR.glob("*.part"):
+        try:
+            leftover.unlink()
+        except OSError:
+            pass
+    probe_tmpfile()
     
     # Initialize stats
     STATS["started_at"] = time.time()
+    refresh_chunk_stats()
     chunk_count, total_bytes = count_chunks()
-    STATS["chunks_stored"] = chunk_count
-    STATS["bytes_stored"] = total_bytes
     
     # Print banner
     print()
@@ -398,9 +837,18 @@ def main():
     hb = threading.Thread(target=heartbeat_thread, daemon=True)
     hb.start()
     
-    # Run Flask
-    LOG.info(f"Node running on {NODE_HOST}:{NODE_PORT}")
-    app.run(host=NODE_HOST, port=NODE_PORT, threaded=True)
+    # Run with waitress if available, else Flask's built-in server
+    LOG.info("Node running on %s:%s", NODE_HOST, NODE_PORT)
+    try:
+        from waitress import serve
+    except ImportError:
+        serve = None
+    
+    if serve is not None:
+        serve(app, host=NODE_HOST, port=NODE_PORT, threads=16, connection_limit=1000)
+    else:
+        LOG.info("waitress not installed, using Flask's development server")
+        app.run(host=NODE_HOST, port=NODE_PORT, threaded=True)
 
 
 if __name__ == "__main__":
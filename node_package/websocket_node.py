@@ -7,12 +7,14 @@ Connects to the server via WebSocket - works through NAT/firewalls without port
 
 import os
 import sys
+import mmap
+import errno
 import time
 import json
-import base64
 import hashlib
 import logging
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 # Try to import socketio, install if missing
@@ -24,6 +26,12 @@ except ImportError:
     subprocess.check_call([sys.executable, "-m", "pip", "install", "python-socketio[client]", "websocket-client", "-q"])
     import socketio
 
+# SIMD-accelerated base64 when available (drop-in for the stdlib module)
+try:
+    import pybase64 as base64
+except ImportError:
+    import base64
+
 # =============================================================================
 # Configuration
 # =============================================================================
@@ -33,6 +41,11 @@ logging.basicConfig(
 )
 LOG = logging.getLogger("storage-node")
 
+IO_WORKERS = 4  # Concurrent chunk reads/writes
+DIRECT_IO_ALIGN = 4096  # O_DIRECT buffer/length alignment
+STATS_RESCAN_INTERVAL = 300  # Seconds between drift-correcting storage rescans
+CHUNK_LOCK_STRIPES = 64  # Locks serializing store/delete of the same chunk hash
+
 # =============================================================================
 # Storage Node Class
 # =============================================================================
@@ -56,6 +69,32 @@ class StorageNode:
             http_session=None  # Use default session
         )
 
+        # chunk_hash -> st_mtime_ns when the file was last known to match
+        # its hash; an unchanged mtime lets verify_chunk skip re-hashing
+        self._verified_file = self.storage_dir / '.verified.json'
+        self._verified = self._load_verified()
+
+        # Raw bytes instead of base64 for chunk payloads, once the server
+        # confirms it understands them (see connect handler)
+        self._binary_chunks = False
+
+        # Chunk store/retrieve disk work, kept off the Socket.IO event thread
+        self._io_pool = ThreadPoolExecutor(max_workers=IO_WORKERS,
+                                           thread_name_prefix='chunk-io')
+
+        # Write chunks with O_DIRECT (Linux) so immutable blobs we rarely
+        # re-read don't churn the page cache; cleared if the fs rejects it
+        self._direct_io = hasattr(os, 'O_DIRECT')
+
+        # Running chunk count/size, kept current by the store and delete
+        # handlers so get_storage_stats doesn't walk the directory
+        self._stats_lock = threading.Lock()
+        self._chunk_count, self._total_bytes = self._scan_storage()
+        self._last_rescan = time.time()
+        # Store/delete of one hash run one at a time (I/O pool workers could
+        # otherwise both see a chunk as new and count it twice)
+        self._chunk_locks = [threading.Lock() for _ in range(CHUNK_LOCK_STRIPES)]
+
         self._setup_handlers()
         self._running = False
         self._heartbeat_thread = None
@@ -66,15 +105,7 @@ class StorageNode:
         @self.sio.event
         def connect():
             LOG.info(f"Connected to server: {self.server_url}")
-            # Register with server
-            response = self.sio.call('node_register', {
-                'node_id': self.node_id,
-                'capacity_gb': self.capacity_gb
-            })
-            if response.get('status') == 'registered':
-                LOG.info(f"Registered as node: {self.node_id}")
-            else:
-                LOG.error(f"Registration failed: {response}")
+            self._register()
 
         @self.sio.event
         def disconnect():
@@ -92,91 +123,16 @@ class StorageNode:
         @self.sio.on('store_chunk')
         def handle_store_chunk(data):
             """Server requests us to store a chunk."""
-            request_id = data.get('request_id')
-            chunk_hash = data.get('chunk_hash')
-            chunk_data_b64 = data.get('chunk_data')
-
-            LOG.info(f"Storing chunk: {chunk_hash[:16]}...")
-
-            try:
-                chunk_data = base64.b64decode(chunk_data_b64)
-
-                # Verify hash
-                actual_hash = hashlib.sha256(chunk_data).hexdigest()
-                if actual_hash != chunk_hash:
-                    LOG.error(f"Hash mismatch: expected {chunk_hash}, got {actual_hash}")
-                    self.sio.emit('chunk_stored', {
-                        'node_id': self.node_id,
-                        'request_id': request_id,
-                        'success': False,
-                        'chunk_hash': chunk_hash
-                    })
-                    return
-
-                # Store chunk
-                chunk_path = self.storage_dir / chunk_hash
-                with open(chunk_path, 'wb') as f:
-                    f.write(chunk_data)
-
-                LOG.info(f"Stored chunk: {chunk_hash[:16]}... ({len(chunk_data)} bytes)")
-
-                self.sio.emit('chunk_stored', {
-                    'node_id': self.node_id,
-                    'request_id': request_id,
-                    'success': True,
-                    'chunk_hash': chunk_hash
-                })
-
-            except Exception as e:
-                LOG.error(f"Error storing chunk: {e}")
-                self.sio.emit('chunk_stored', {
-                    'node_id': self.node_id,
-                    'request_id': request_id,
-                    'success': False,
-                    'chunk_hash': chunk_hash
-                })
+            # Decode, hash and write on the I/O pool so the Socket.IO
+            # dispatcher stays free for heartbeats and other events
+            self._io_pool.submit(self._store_chunk, data.get('request_id'),
+                                 data.get('chunk_hash'), data.get('chunk_data'))
 
         @self.sio.on('retrieve_chunk')
         def handle_retrieve_chunk(data):
             """Server requests a chunk from us."""
-            request_id = data.get('request_id')
-            chunk_hash = data.get('chunk_hash')
-
-            LOG.info(f"Retrieving chunk: {chunk_hash[:16]}...")
-
-            try:
-                chunk_path = self.storage_dir / chunk_hash
-
-                if not chunk_path.exists():
-                    LOG.warning(f"Chunk not found: {chunk_hash[:16]}...")
-                    self.sio.emit('chunk_retrieved', {
-                        'node_id': self.node_id,
-                        'request_id': request_id,
-                        'success': False,
-                        'chunk_data': None
-                    })
-                    return
-
-                with open(chunk_path, 'rb') as f:
-                    chunk_data = f.read()
-
-                LOG.info(f"Retrieved chunk: {chunk_hash[:16]}... ({len(chunk_data)} bytes)")
-
-                self.sio.emit('chunk_retrieved', {
-                    'node_id': self.node_id,
-                    'request_id': request_id,
-                    'success': True,
-                    'chunk_data': base64.b64encode(chunk_data).decode('utf-8')
-                })
-
-            except Exception as e:
-                LOG.error(f"Error retrieving chunk: {e}")
-                self.sio.emit('chunk_retrieved', {
-                    'node_id': self.node_id,
-                    'request_id': request_id,
-                    'success': False,
-                    'chunk_data': None
-                })
+            self._io_pool.submit(self._retrieve_chunk, data.get('request_id'),
+                                 data.get('chunk_hash'))
 
         @self.sio.on('delete_chunk')
         def handle_delete_chunk(data):
@@ -188,8 +144,18 @@ class StorageNode:
             try:
                 chunk_path = self.storage_dir / chunk_hash
 
-                if chunk_path.exists():
-                    chunk_path.unlink()
+                with self._chunk_lock(chunk_hash):
+                    self._verified.pop(chunk_hash, None)
+                    try:
+                        size = chunk_path.stat().st_size
+                    except FileNotFoundError:
+                        size = None
+                    if size is not None:
+                        chunk_path.unlink()
+                        with self._stats_lock:
+                            self._chunk_count -= 1
+                            self._total_bytes -= size
+                if size is not None:
                     LOG.info(f"Deleted chunk: {chunk_hash[:16]}...")
                 else:
                     LOG.warning(f"Chunk not found for deletion: {chunk_hash[:16]}...")
@@ -199,9 +165,16 @@ class StorageNode:
 
         @self.sio.on('verify_chunk')
         def handle_verify_chunk(data):
-            """Server requests proof that we have a chunk (for consensus)."""
+            """
+            Server requests proof that we have a chunk (for consensus).
+
+            With a 'nonce' (hex) the reply carries proof = sha256(nonce || chunk),
+            which can't be answered from a cached hash; without one, a chunk
+            unchanged since it was last hashed is reported valid from the cache.
+            """
             request_id = data.get('request_id')
             chunk_hash = data.get('chunk_hash')
+            nonce = data.get('nonce')
 
             LOG.info(f"Verifying chunk: {chunk_hash[:16]}...")
 
@@ -217,21 +190,35 @@ class StorageNode:
                     })
                     return
 
-                # Read and verify hash
-                with open(chunk_path, 'rb') as f:
-                    chunk_data = f.read()
-
-                actual_hash = hashlib.sha256(chunk_data).hexdigest()
-                is_valid = actual_hash == chunk_hash
-
-                self.sio.emit('chunk_verified', {
+                st = chunk_path.stat()
+                proof = None
+                if nonce is None and self._verified.get(chunk_hash) == st.st_mtime_ns:
+                    # Unchanged since it was last hashed
+                    is_valid = True
+                    size = st.st_size
+                else:
+                    # Hash while reading; the bytes themselves are never needed
+                    if nonce is None:
+                        actual_hash, size = self._hash_file(chunk_path)
+                    else:
+                        actual_hash, proof, size = self._prove_file(chunk_path, bytes.fromhex(nonce))
+                    is_valid = actual_hash == chunk_hash
+                    if is_valid:
+                        self._verified[chunk_hash] = st.st_mtime_ns
+                    else:
+                        self._verified.pop(chunk_hash, None)
+
+                response = {
                     'node_id': self.node_id,
                     'request_id': request_id,
                     'exists': True,
                     'valid': is_valid,
                     'chunk_hash': chunk_hash,
-                    'size': len(chunk_data)
-                })
+                    'size': size
+                }
+                if proof is not None:
+                    response['proof'] = proof
+                self.sio.emit('chunk_verified', response)
 
                 LOG.info(f"Verified chunk: {chunk_hash[:16]}... (valid={is_valid})")
 
@@ -244,14 +231,239 @@ class StorageNode:
                     'chunk_hash': chunk_hash
                 })
 
+    def _chunk_lock(self, chunk_hash):
+        """Lock serializing writes and deletes of chunk_hash."""
+        return self._chunk_locks[hash(chunk_hash) % CHUNK_LOCK_STRIPES]
+
+    def _store_chunk(self, request_id, chunk_hash, chunk_data):
+        """Verify and write a chunk, then ack it (runs on the I/O pool)."""
+        LOG.info(f"Storing chunk: {chunk_hash[:16]}...")
+
+        try:
+            # Binary attachment (bytes) or legacy base64 string
+            if isinstance(chunk_data, str):
+                chunk_data = base64.b64decode(chunk_data)
+
+            # Verify hash
+            actual_hash = hashlib.sha256(chunk_data).hexdigest()
+            if actual_hash != chunk_hash:
+                LOG.error(f"Hash mismatch: expected {chunk_hash}, got {actual_hash}")
+                self.sio.emit('chunk_stored', {
+                    'node_id': self.node_id,
+                    'request_id': request_id,
+                    'success': False,
+                    'chunk_hash': chunk_hash
+                })
+                return
+
+            # Store chunk
+            chunk_path = self.storage_dir / chunk_hash
+            # Existence check, write and counter update happen together for
+            # a given hash, so concurrent stores of it count it once
+            with self._chunk_lock(chunk_hash):
+                try:
+                    old_size = chunk_path.stat().st_size
+                except FileNotFoundError:
+                    old_size = None
+                self._write_chunk(chunk_path, chunk_data)
+
+                self._verified[chunk_hash] = chunk_path.stat().st_mtime_ns
+                with self._stats_lock:
+                    if old_size is None:
+                        self._chunk_count += 1
+                        self._total_bytes += len(chunk_data)
+                    else:
+                        self._total_bytes += len(chunk_data) - old_size
+
+            LOG.info(f"Stored chunk: {chunk_hash[:16]}... ({len(chunk_data)} bytes)")
+
+            self.sio.emit('chunk_stored', {
+                'node_id': self.node_id,
+                'request_id': request_id,
+                'success': True,
+                'chunk_hash': chunk_hash
+            })
+
+        except Exception as e:
+            LOG.error(f"Error storing chunk: {e}")
+            self.sio.emit('chunk_stored', {
+                'node_id': self.node_id,
+                'request_id': request_id,
+                'success': False,
+                'chunk_hash': chunk_hash
+            })
+
+    def _retrieve_chunk(self, request_id, chunk_hash):
+        """Read a chunk and send it back (runs on the I/O pool)."""
+        LOG.info(f"Retrieving chunk: {chunk_hash[:16]}...")
+
+        try:
+            chunk_path = self.storage_dir / chunk_hash
+
+            if not chunk_path.exists():
+                LOG.warning(f"Chunk not found: {chunk_hash[:16]}...")
+                self.sio.emit('chunk_retrieved', {
+                    'node_id': self.node_id,
+                    'request_id': request_id,
+                    'success': False,
+                    'chunk_data': None
+                })
+                return
+
+            # Unbuffered readall: one read sized from fstat, no extra copy
+            # through a BufferedReader
+            with open(chunk_path, 'rb', buffering=0) as f:
+                chunk_data = f.read()
+
+            LOG.info(f"Retrieved chunk: {chunk_hash[:16]}... ({len(chunk_data)} bytes)")
+
+            self.sio.emit('chunk_retrieved', {
+                'node_id': self.node_id,
+                'request_id': request_id,
+                'success': True,
+                'chunk_data': chunk_data if self._binary_chunks
+                              else base64.b64encode(chunk_data).decode('ascii')
+            })
+
+        except Exception as e:
+            LOG.error(f"Error retrieving chunk: {e}")
+            self.sio.emit('chunk_retrieved', {
+                'node_id': self.node_id,
+                'request_id': request_id,
+                'success': False,
+                'chunk_data': None
+            })
+
+    def _write_chunk(self, path, data):
+        """
+        Write chunk data to path, bypassing the page cache when possible.
+
+        Data goes to a hidden temp file that is renamed into place, so a
+        failed write never leaves a partial chunk under its real name.
+        """
+        tmp_path = path.with_name(f".{path.name}.{threading.get_ident()}.tmp")
+        try:
+            if self._direct_io:
+                try:
+                    self._write_direct(tmp_path, data)
+                except OSError as e:
+                    if e.errno != errno.EINVAL:
+                        raise
+                    LOG.info("Storage filesystem does not support O_DIRECT; using buffered writes")
+                    self._direct_io = False
+            if not self._direct_io:
+                with open(tmp_path, 'wb') as f:
+                    f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    @staticmethod
+    def _write_direct(path, data):
+        """O_DIRECT write from a page-aligned buffer, padded then truncated."""
+        size = len(data)
+        aligned = max(DIRECT_IO_ALIGN, -(-size // DIRECT_IO_ALIGN) * DIRECT_IO_ALIGN)
+        buf = mmap.mmap(-1, aligned)  # Anonymous maps are page-aligned
+        try:
+            buf[:size] = data
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | os.O_DIRECT | os.O_DSYNC, 0o644)
+            try:
+                # Views are released on errors too (the traceback keeps them
+                # alive otherwise); an exported view makes buf.close() raise
+                # BufferError and mask the OSError
+                with memoryview(buf) as view:
+                    written = 0
+                    while written < aligned:
+                        with view[written:] as remaining:
+                            written += os.write(fd, remaining)
+                os.ftruncate(fd, size)
+            finally:
+                os.close(fd)
+        finally:
+            buf.close()
+
+    def _load_verified(self):
+        """Load the verified-chunk cache saved by a previous run."""
+        try:
+            with open(self._verified_file, 'r') as f:
+                return {k: int(v) for k, v in json.load(f).items()}
+        except (OSError, ValueError, AttributeError):
+            return {}
+
+    def _save_verified(self):
+        """Persist the verified-chunk cache for the next run."""
+        tmp_path = self._verified_file.with_suffix('.tmp')
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(dict(self._verified), f)
+            os.replace(tmp_path, self._verified_file)
+        except OSError as e:
+            LOG.debug(f"Could not save verified-chunk cache: {e}")
+
+    @staticmethod
+    def _hash_file(path, block_size=256 * 1024):
+        """SHA-256 a file in blocks. Returns (hexdigest, size)."""
+        with open(path, 'rb', buffering=0) as f:
+            if hasattr(hashlib, 'file_digest'):  # Python 3.11+
+                digest = hashlib.file_digest(f, 'sha256')
+            else:
+                digest = hashlib.sha256()
+                for block in iter(lambda: f.read(block_size), b''):
+                    digest.update(block)
+            return digest.hexdigest(), os.fstat(f.fileno()).st_size
+
+    @staticmethod
+    def _prove_file(path, nonce, block_size=256 * 1024):
+        """
+        Hash a file plainly and with a nonce prefix in one read.
+        Returns (hexdigest, proof hexdigest, size).
+        """
+        digest = hashlib.sha256()
+        proof = hashlib.sha256(nonce)
+        size = 0
+        with open(path, 'rb', buffering=0) as f:
+            for block in iter(lambda: f.read(block_size), b''):
+                digest.update(block)
+                proof.update(block)
+                size += len(block)
+        return digest.hexdigest(), proof.hexdigest(), size
+
+    def _register(self):
+        """Register with the server over the current connection."""
+        response = self.sio.call('node_register', {
+            'node_id': self.node_id,
+            'capacity_gb': self.capacity_gb,
+            'binary_chunks': True
+        })
+        if response.get('status') == 'registered':
+            self._binary_chunks = bool(response.get('binary_chunks'))
+            LOG.info(f"Registered as node: {self.node_id}")
+        else:
+            LOG.error(f"Registration failed: {response}")
+
     def _heartbeat_loop(self):
         """Send periodic heartbeats to server."""
         while self._running:
             try:
                 if self.sio.connected:
-                    self.sio.call('node_heartbeat', {'node_id': self.node_id}, timeout=10)
+                    response = self.sio.call('node_heartbeat', {'node_id': self.node_id}, timeout=10)
+                    if response and response.get('error') == 'not registered':
+                        # Server dropped us (e.g. reaped after missed heartbeats)
+                        LOG.warning("Server no longer has this node registered; re-registering")
+                        self._register()
             except Exception as e:
                 LOG.debug(f"Heartbeat error: {e}")
+
+            if time.time() - self._last_rescan >= STATS_RESCAN_INTERVAL:
+                # Correct any drift from files changed behind our back
+                count, total = self._scan_storage()
+                with self._stats_lock:
+                    self._chunk_count, self._total_bytes = count, total
+                self._last_rescan = time.time()
             time.sleep(30)
 
     def start(self):
@@ -282,13 +494,26 @@ class StorageNode:
         self._running = False
         if self.sio.connected:
             self.sio.disconnect()
+        self._io_pool.shutdown(wait=True)
+        self._save_verified()
+
+    def _scan_storage(self):
+        """Walk the storage dir once. Returns (chunk_count, total_bytes)."""
+        count = total = 0
+        with os.scandir(self.storage_dir) as it:
+            for entry in it:
+                if entry.name.startswith('.') or not entry.is_file(follow_symlinks=False):
+                    continue
+                count += 1
+                total += entry.stat(follow_symlinks=False).st_size
+        return count, total
 
     def get_storage_stats(self):
         """Get storage statistics."""
-        chunks = list(self.storage_dir.glob('*'))
-        total_size = sum(c.stat().st_size for c in chunks if c.is_file())
+        with self._stats_lock:
+            chunk_count, total_size = self._chunk_count, self._total_bytes
         return {
-            'chunk_count': len(chunks),
+            'chunk_count': chunk_count,
             'total_size_bytes': total_size,
             'total_size_mb': round(total_size / (1024 * 1024), 2)
         }
@@ -331,6 +556,11 @@ def main():
     print("=" * 60)
     print()
 
+    # hashlib uses OpenSSL's SHA-256 (SHA-NI / ARMv8 crypto when the CPU
+    # has them); log the version so slow hashing can be traced to an old build
+    import ssl
+    LOG.info(f"Hashing backend: {ssl.OPENSSL_VERSION}")
+
     node = StorageNode(
         server_url=args.server,
         node_id=node_id,
@@ -342,6 +572,7 @@ def main():
         node.start()
     except KeyboardInterrupt:
         print("\nShutting down...")
+    finally:
         node.stop()
 
 
@@ -11,20 +11,47 @@ import time
 import threading
 import logging
 import uuid
-import base64
 import json
+import itertools
+import heapq
+from collections import deque
 from pathlib import Path
 try:
-    # Use gevent Queue for better async performance
-    from gevent.queue import Queue, Empty
+    # SIMD-accelerated base64, API-compatible with the stdlib module
+    import pybase64 as base64
 except ImportError:
-    # Fallback to standard Queue if gevent not available
-    from queue import Queue, Empty
+    import base64
+try:
+    # Use gevent Event for better async performance
+    from gevent.event import Event
+except ImportError:
+    # Fallback to standard Event if gevent not available
+    from threading import Event
+try:
+    # Greenlet pool for concurrent node transfers (matches the gevent worker)
+    from gevent.pool import Pool as TransferPool
+except ImportError:
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    class TransferPool(ThreadPoolExecutor):
+        """Thread pool exposing the gevent Pool spawn/imap_unordered API."""
+
+        def __init__(self, size):
+            super().__init__(max_workers=size)
+
+        def spawn(self, func, *args):
+            future = self.submit(func, *args)
+            future.get = future.result  # Same call as gevent's Greenlet.get()
+            return future
+
+        def imap_unordered(self, func, iterable):
+            for future in as_completed([self.submit(func, item) for item in iterable]):
+                yield future.result()
 
 # Add project root to path
 sys.path.insert(0, str(Path(__file__).parent))
 
-from flask import Flask, request, jsonify, send_from_directory, Response, g
+from flask import Flask, request, jsonify, send_from_directory, Response, g, stream_with_context
 from flask_cors import CORS
 from flask_socketio import SocketIO, emit, join_room, leave_room
 from flask_limiter import Limiter
@@ -32,7 +59,7 @@ from flask_limiter.util import get_remote_address
 
 # Import config
 from config import (
-    NODE_TTL, CHUNK_SIZE, REPLICATION_FACTOR,
+    NODE_TTL, CHUNK_SIZE, REPLICATION_FACTOR, UPLOAD_CONCURRENCY,
     CONSENSUS_MIN_CONFIRMATIONS, CONSENSUS_QUORUM_PERCENT, CONSENSUS_TIMEOUT
 )
 
@@ -40,7 +67,7 @@ from config import (
 from backend import auth, uploader
 from backend.models import init_db, get_session, User
 from shared.blockchain import SimpleBlockchain, BlockStatus
-from shared import crypto, chunker
+from shared import crypto, chunker, json_provider, package_zip
 
 # =============================================================================
 # Logging
@@ -55,6 +82,25 @@ LOG = logging.getLogger("decentrastore")
 # Flask App with SocketIO
 # =============================================================================
 app = Flask(__name__, static_folder="frontend")
+json_provider.install(app)
+
+def json_response(payload, status=200):
+    """JSON Response built straight from serialized bytes (orjson when available)."""
+    return Response(json_provider.dumps(payload), status=status, mimetype="application/json")
+
+def fast_json(max_bytes=4096):
+    """
+    Parse a small JSON object body straight off the request stream, skipping
+    Flask's mimetype checks. Returns None if the body is too large or not a
+    JSON object.
+    """
+    if (request.content_length or 0) > max_bytes:
+        return None
+    try:
+        data = json_provider.loads(request.stream.read(max_bytes))
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
 
 # CORS - restrict to same origin in production, allow all in dev
 ALLOWED_ORIGINS = os.environ.get("ALLOWED_ORIGINS", "*").split(",")
@@ -97,10 +143,52 @@ blockchain = SimpleBlockchain(DATA_DIR / "blockchain.json")
 # =============================================================================
 # WebSocket Node Management
 # =============================================================================
-NODES = {}  # node_id -> {sid, capacity_gb, last_seen, response_queue}
-NODES_LOCK = threading.Lock()
+NODES = {}  # node_id -> {sid, capacity_gb, last_seen, pending}
+NODES_LOCK = threading.Lock()  # Guards the NODES registry itself
 TTL = NODE_TTL
 
+# Chunk store/retrieve requests in flight at once across all uploads/downloads
+TRANSFER_CONCURRENCY = max(1, UPLOAD_CONCURRENCY)
+TRANSFER_POOL = TransferPool(TRANSFER_CONCURRENCY)
+
+# Chunks read, encrypted and sent per step of an upload (bounds memory use);
+# large enough that a window's copies can fill the transfer pool
+UPLOAD_WINDOW_CHUNKS = max(8, TRANSFER_CONCURRENCY // max(1, REPLICATION_FACTOR))
+
+# Chunks one download may have in flight or waiting to be sent at a time
+DOWNLOAD_READ_AHEAD = 8
+
+def imap_window(func, iterable, window):
+    """
+    Ordered map over TRANSFER_POOL with at most `window` calls outstanding,
+    so a slow reader holds back retrieval (and its memory) and one caller
+    can't take over the pool shared with uploads.
+    """
+    items = iter(iterable)
+    pending = deque(TRANSFER_POOL.spawn(func, item) for item in itertools.islice(items, window))
+    for item in items:
+        result = pending.popleft().get()
+        pending.append(TRANSFER_POOL.spawn(func, item))
+        yield result
+    while pending:
+        yield pending.popleft().get()
+
+class PendingReply:
+    """An in-flight node request; the caller waits until a reply is set."""
+    __slots__ = ('event', 'result')
+
+    def __init__(self):
+        self.event = Event()
+        self.result = None
+
+    def set(self, result):
+        self.result = result
+        self.event.set()
+
+    def wait(self, timeout):
+        """Return the reply, or None on timeout."""
+        return self.result if self.event.wait(timeout) else None
+
 @socketio.on('connect')
 def handle_connect():
     LOG.info(f"WebSocket client connected: {request.sid}")
@@ -114,12 +202,16 @@ def handle_disconnect():
         for node_id in to_remove:
             LOG.info(f"Node disconnected: {node_id}")
             del NODES[node_id]
+    if to_remove:
+        invalidate_network_peers()
 
 @socketio.on('node_register')
 def handle_node_register(data):
     """Node registers itself via WebSocket."""
     node_id = data.get('node_id')
     capacity_gb = data.get('capacity_gb', 0)
+    # Node can take raw bytes (Socket.IO binary attachments) instead of base64
+    binary_chunks = bool(data.get('binary_chunks', False))
 
     if not node_id:
         return {'error': 'node_id required'}
@@ -129,10 +221,17 @@ def handle_node_register(data):
         NODES[node_id] = {
             'sid': request.sid,
             'capacity_gb': capacity_gb,
+            'binary_chunks': binary_chunks,
             'last_seen': time.time(),
-            'response_queues': {}  # request_id -> Queue for responses
+            # In-flight requests to this node. Only touched with single
+            # get/set/pop calls, which are atomic under the GIL, so the
+            # request path takes no locks at all
+            'pending': {}  # request_id -> PendingReply
         }
 
+    if is_new:
+        invalidate_network_peers()
+
     join_room(f'node_{node_id}')
     LOG.info(f"Node {'registered' if is_new else 're-registered'} via WebSocket: {node_id}")
 
@@ -141,17 +240,19 @@ def handle_node_register(data):
     socketio.emit('test_ping', {'message': 'Room communication test'}, room=room_name)
     LOG.info(f"Sent test_ping to room '{room_name}'")
 
-    return {'status': 'registered', 'node_id': node_id}
+    return {'status': 'registered', 'node_id': node_id, 'binary_chunks': True}
 
 @socketio.on('node_heartbeat')
 def handle_node_heartbeat(data):
     """Node sends heartbeat."""
     node_id = data.get('node_id')
 
-    with NODES_LOCK:
-        if node_id in NODES:
-            NODES[node_id]['last_seen'] = time.time()
-            return {'status': 'ok'}
+    # Single-key store on the node's own entry; atomic under the GIL, so
+    # heartbeats don't queue behind NODES_LOCK
+    node_info = NODES.get(node_id)
+    if node_info is not None:
+        node_info['last_seen'] = time.time()
+        return {'status': 'ok'}
 
     return {'error': 'not registered'}
 
@@ -163,27 +264,29 @@ def handle_chunk_stored(data):
     success = data.get('success', False)
     chunk_hash = data.get('chunk_hash')
 
-    with NODES_LOCK:
-        if node_id in NODES and request_id in NODES[node_id].get('response_queues', {}):
-            NODES[node_id]['response_queues'][request_id].put({
-                'success': success,
-                'chunk_hash': chunk_hash
-            })
+    reply = find_pending_reply(node_id, request_id)
+    if reply:
+        reply.set({
+            'success': success,
+            'chunk_hash': chunk_hash
+        })
 
 @socketio.on('chunk_retrieved')
 def handle_chunk_retrieved(data):
     """Node sends back requested chunk."""
     node_id = data.get('node_id')
     request_id = data.get('request_id')
-    chunk_data = data.get('chunk_data')  # base64 encoded
+    chunk_data = data.get('chunk_data')  # bytes, or base64 str from older nodes
     success = data.get('success', False)
-
-    with NODES_LOCK:
-        if node_id in NODES and request_id in NODES[node_id].get('response_queues', {}):
-            NODES[node_id]['response_queues'][request_id].put({
-                'success': success,
-                'chunk_data': base64.b64decode(chunk_data) if chunk_data else None
-            })
+    if isinstance(chunk_data, str):
+        chunk_data = base64.b64decode(chunk_data)
+
+    reply = find_pending_reply(node_id, request_id)
+    if reply:
+        reply.set({
+            'success': success,
+            'chunk_data': chunk_data or None
+        })
 
 def get_active_nodes():
     """Get list of active WebSocket-connected nodes."""
@@ -195,17 +298,46 @@ def get_active_nodes():
             if (now - info['last_seen']) <= TTL
         ]
 
-def send_chunk_to_node(node_id, chunk_data, chunk_hash, timeout=120):
-    """Send chunk to node via WebSocket and wait for confirmation."""
+def count_active_nodes(now=None):
+    """Number of active WebSocket nodes, without building the node list."""
+    if now is None:
+        now = time.time()
     with NODES_LOCK:
-        if node_id not in NODES:
-            return False
+        return sum(1 for info in NODES.values() if (now - info['last_seen']) <= TTL)
+
+def find_pending_reply(node_id, request_id):
+    """Look up the PendingReply a node is answering, if still waited on."""
+    node_info = NODES.get(node_id)
+    if node_info is None:
+        return None
+    return node_info['pending'].get(request_id)
+
+# Request IDs only need to be unique within this process; next() on a
+# count is atomic, so no lock or uuid4 (urandom read + formatting) per chunk
+_request_ids = itertools.count(1)
+
+def open_request(node_id):
+    """Register a new request to node_id. Returns (node_info, request_id, reply) or None."""
+    node_info = NODES.get(node_id)
+    if node_info is None:
+        return None
+
+    request_id = next(_request_ids)
+    reply = PendingReply()
+    node_info['pending'][request_id] = reply
+    return node_info, request_id, reply
+
+def close_request(node_info, request_id):
+    """Forget a request once it has been answered or timed out."""
+    node_info['pending'].pop(request_id, None)
 
-        node_info = NODES[node_id]
-        request_id = str(uuid.uuid4())
-        response_queue = Queue()
-        node_info['response_queues'][request_id] = response_queue
-        sid = node_info['sid']
+def send_chunk_to_node(node_id, chunk_data, chunk_hash, timeout=120):
+    """Send chunk to node via WebSocket and wait for confirmation."""
+    opened = open_request(node_id)
+    if opened is None:
+        return False
+    node_info, request_id, reply = opened
+    binary_chunks = node_info.get('binary_chunks', False)
 
     start_time = time.time()
     try:
@@ -215,38 +347,29 @@ def send_chunk_to_node(node_id, chunk_data, chunk_hash, timeout=120):
         socketio.emit('store_chunk', {
             'request_id': request_id,
             'chunk_hash': chunk_hash,
-            'chunk_data': base64.b64encode(chunk_data).decode('utf-8')
+            'chunk_data': chunk_data if binary_chunks
+                          else base64.b64encode(chunk_data).decode('ascii')
         }, room=room_name, namespace='/')
         emit_time = time.time() - start_time
         LOG.info(f"Emitted store_chunk in {emit_time:.3f}s, waiting for response...")
 
         # Wait for response
-        try:
-            response = response_queue.get(timeout=timeout)
-            total_time = time.time() - start_time
-            LOG.info(f"Received chunk_stored response in {total_time:.3f}s")
-            return response.get('success', False)
-        except Empty:
-            total_time = time.time() - start_time
+        response = reply.wait(timeout)
+        total_time = time.time() - start_time
+        if response is None:
             LOG.error(f"Timeout ({total_time:.1f}s) waiting for chunk store confirmation from {node_id}")
             return False
+        LOG.info(f"Received chunk_stored response in {total_time:.3f}s")
+        return response.get('success', False)
     finally:
-        # Cleanup
-        with NODES_LOCK:
-            if node_id in NODES and request_id in NODES[node_id].get('response_queues', {}):
-                del NODES[node_id]['response_queues'][request_id]
+        close_request(node_info, request_id)
 
 def retrieve_chunk_from_node(node_id, chunk_hash, timeout=30):
     """Request chunk from node via WebSocket."""
-    with NODES_LOCK:
-        if node_id not in NODES:
-            return None
-
-        node_info = NODES[node_id]
-        request_id = str(uuid.uuid4())
-        response_queue = Queue()
-        node_info['response_queues'][request_id] = response_queue
-        sid = node_info['sid']
+    opened = open_request(node_id)
+    if opened is None:
+        return None
+    node_info, request_id, reply = opened
 
     try:
         # Send retrieve request to node
@@ -256,29 +379,102 @@ def retrieve_chunk_from_node(node_id, chunk_hash, timeout=30):
         }, room=f'node_{node_id}', namespace='/')
 
         # Wait for response
-        try:
-            response = response_queue.get(timeout=timeout)
-            if response.get('success'):
-                return response.get('chunk_data')
-            return None
-        except Empty:
+        response = reply.wait(timeout)
+        if response is None:
             LOG.error(f"Timeout waiting for chunk from {node_id}")
             return None
+        if response.get('success'):
+            return response.get('chunk_data')
+        return None
     finally:
-        # Cleanup
-        with NODES_LOCK:
-            if node_id in NODES and request_id in NODES[node_id].get('response_queues', {}):
-                del NODES[node_id]['response_queues'][request_id]
+        close_request(node_info, request_id)
 
 # =============================================================================
 # Legacy HTTP Discovery (for backwards compatibility)
 # =============================================================================
-PEERS = {}
-PEERS_LOCK = threading.Lock()
+PEERS = {}  # node_id -> peer info; entries are replaced, never mutated
+PEERS_LOCK = threading.Lock()  # Held only by membership changes
+# node_id -> last heartbeat time. Kept apart from PEERS so heartbeats are a
+# single lock-free dict store (atomic under the GIL)
+HEARTBEATS = {}
+# Liveness index: ALIVE holds the node_ids heard from within TTL, and
+# HB_HEAP holds (heartbeat time, node_id) pushes in time order so the
+# reaper can expire them without scanning every peer. Heap entries
+# superseded by a later heartbeat are skipped when popped. Peers that
+# expire move to REAP_HEAP, which the reaper drains after TTL * 2.
+ALIVE = set()
+HB_HEAP = []
+REAP_HEAP = []
+HB_HEAP_LOCK = threading.Lock()
+
+def note_heartbeat(node_id, now):
+    """Record a heartbeat and mark the peer alive."""
+    HEARTBEATS[node_id] = now
+    with HB_HEAP_LOCK:
+        heapq.heappush(HB_HEAP, (now, node_id))
+    ALIVE.add(node_id)
+
+def expire_heartbeats(now):
+    """Drop peers whose newest heartbeat is older than TTL from ALIVE."""
+    expired = False
+    with HB_HEAP_LOCK:
+        while HB_HEAP and now - HB_HEAP[0][0] > TTL:
+            ts, node_id = heapq.heappop(HB_HEAP)
+            if HEARTBEATS.get(node_id) == ts:
+                ALIVE.discard(node_id)
+                heapq.heappush(REAP_HEAP, (ts, node_id))
+                expired = True
+    if expired:
+        invalidate_peer_snapshot()
+
+# Alive-peer list reused for up to PEER_SNAPSHOT_TTL seconds, so polling
+# /peers doesn't rebuild the list on every request
+PEER_SNAPSHOT_TTL = 1.0
+_peer_snapshot = (0.0, [])  # (built_at, alive peers)
+
+def get_alive_peers():
+    """Alive legacy HTTP peers (snapshot, at most PEER_SNAPSHOT_TTL old)."""
+    global _peer_snapshot
+    now = time.time()
+    built_at, alive = _peer_snapshot
+    if now - built_at < PEER_SNAPSHOT_TTL:
+        return alive
+
+    expire_heartbeats(now)
+    alive = []
+    for node_id in tuple(ALIVE):
+        p = PEERS.get(node_id)
+        if p is not None:
+            alive.append({
+                "node_id": p["node_id"],
+                "ip": p["ip"],
+                "port": p["port"],
+                "public_ip": p.get("public_ip", p["ip"]),
+                "capacity_gb": p.get("capacity_gb", 0),
+                "last_heartbeat": HEARTBEATS.get(node_id, 0.0),
+            })
+    _peer_snapshot = (now, alive)
+    return alive
+
+def invalidate_peer_snapshot():
+    """Drop the snapshot after membership or liveness changes."""
+    global _peer_snapshot
+    _peer_snapshot = (0.0, [])
+    invalidate_network_peers()
+
+# Serialized /network/peers body, reused for up to PEER_SNAPSHOT_TTL seconds
+_network_peers_body = (0.0, b"")  # (built_at, JSON bytes)
+
+def invalidate_network_peers():
+    """Drop the cached /network/peers body after a node joins or leaves."""
+    global _network_peers_body
+    _network_peers_body = (0.0, b"")
 
 @app.route("/register", methods=["POST"])
 def register_node():
-    data = request.get_json(force=True)
+    data = fast_json()
+    if data is None:
+        return jsonify({"error": "Invalid JSON body"}), 400
     node_id = data.get("node_id")
     ip = data.get("ip")
     port = data.get("port")
@@ -287,45 +483,63 @@ def register_node():
         return jsonify({"error": "node_id, ip, and port required"}), 400
 
     now = time.time()
+    record = {
+        "node_id": node_id,
+        "ip": ip,
+        "port": int(port),
+        "public_ip": data.get("public_ip", ip),
+        "capacity_gb": data.get("capacity_gb", 0),
+        "meta": data.get("meta", {}),
+    }
     with PEERS_LOCK:
-        is_new = node_id not in PEERS
-        PEERS[node_id] = {
-            "node_id": node_id,
-            "ip": ip,
-            "port": int(port),
-            "public_ip": data.get("public_ip", ip),
-            "capacity_gb": data.get("capacity_gb", 0),
-            "meta": data.get("meta", {}),
-            "last_heartbeat": now,
-            "registered_at": PEERS.get(node_id, {}).get("registered_at", now),
-        }
+        current = PEERS.get(node_id)
+        is_new = current is None
+        # Periodic re-registration usually repeats the same details; then it
+        # only counts as a heartbeat and the entry is left as it is
+        changed = is_new or any(current.get(key) != value for key, value in record.items())
+        if changed:
+            record["registered_at"] = now if is_new else current.get("registered_at", now)
+            PEERS[node_id] = record
+        was_alive = node_id in ALIVE
+        note_heartbeat(node_id, now)
+    if changed or not was_alive:
+        invalidate_peer_snapshot()
 
     LOG.info(f"Node {'registered' if is_new else 're-registered'}: {node_id}")
     return jsonify({"status": "registered", "node_id": node_id, "ttl_seconds": TTL})
 
 @app.route("/heartbeat", methods=["POST"])
 def heartbeat():
-    data = request.get_json(force=True)
+    data = fast_json()
+    if data is None:
+        return jsonify({"error": "Invalid JSON body"}), 400
     node_id = data.get("node_id")
 
     if not node_id:
         return jsonify({"error": "node_id required"}), 400
 
-    with PEERS_LOCK:
-        if node_id not in PEERS:
-            return jsonify({"error": "not registered"}), 404
-        PEERS[node_id]["last_heartbeat"] = time.time()
+    if node_id not in PEERS:
+        return jsonify({"error": "not registered"}), 404
+    was_alive = node_id in ALIVE
+    note_heartbeat(node_id, time.time())
+    if not was_alive:
+        invalidate_peer_snapshot()
 
     return jsonify({"status": "ok", "ttl_seconds": TTL})
 
 @app.route("/unregister", methods=["POST"])
 def unregister():
-    data = request.get_json(force=True)
+    data = fast_json()
+    if data is None:
+        return jsonify({"error": "Invalid JSON body"}), 400
     node_id = data.get("node_id")
 
     with PEERS_LOCK:
         if node_id in PEERS:
             del PEERS[node_id]
+            HEARTBEATS.pop(node_id, None)
+            ALIVE.discard(node_id)
+            invalidate_peer_snapshot()
             LOG.info(f"Node unregistered: {node_id}")
             return jsonify({"status": "unregistered"})
 
@@ -333,21 +547,8 @@ def unregister():
 
 @app.route("/peers", methods=["GET"])
 def get_peers():
-    with PEERS_LOCK:
-        now = time.time()
-        alive = [
-            {
-                "node_id": p["node_id"],
-                "ip": p["ip"],
-                "port": p["port"],
-                "public_ip": p.get("public_ip", p["ip"]),
-                "capacity_gb": p.get("capacity_gb", 0),
-                "last_heartbeat": p["last_heartbeat"],
-            }
-            for p in PEERS.values()
-            if (now - p["last_heartbeat"]) <= TTL
-        ]
-    return jsonify({"peers": alive, "total_active": len(alive)})
+    alive = get_alive_peers()
+    return json_response({"peers": alive, "total_active": len(alive)})
 
 # =============================================================================
 # BACKEND SERVICE
@@ -357,11 +558,12 @@ def get_peers():
 @app.route("/", methods=["GET"])
 @app.route("/health", methods=["GET"])
 def health():
-    ws_nodes = len(get_active_nodes())
+    now = time.time()
+    ws_nodes = count_active_nodes(now)
     return jsonify({
         "status": "healthy",
         "service": "decentrastore",
-        "timestamp": int(time.time()),
+        "timestamp": int(now),
         "active_nodes": ws_nodes,
         "websocket_nodes": ws_nodes
     })
@@ -380,7 +582,7 @@ def serve_static(filename):
 @app.route("/auth/register", methods=["POST"])
 @limiter.limit("5 per minute")  # Prevent registration spam
 def auth_register():
-    data = request.get_json()
+    data = fast_json()
     if not data:
         return jsonify({"error": "Invalid JSON body"}), 400
 
@@ -404,11 +606,21 @@ def auth_register():
         return jsonify({"error": "Password must be at least 8 characters"}), 400
     if len(password) > 128:
         return jsonify({"error": "Password must be less than 128 characters"}), 400
-    if not any(c.isupper() for c in password):
+
+    # One pass over the password for all three character-class checks
+    has_upper = has_lower = has_digit = False
+    for c in password:
+        if c.isupper():
+            has_upper = True
+        elif c.islower():
+            has_lower = True
+        elif c.isdigit():
+            has_digit = True
+    if not has_upper:
         return jsonify({"error": "Password must contain at least one uppercase letter"}), 400
-    if not any(c.islower() for c in password):
+    if not has_lower:
         return jsonify({"error": "Password must contain at least one lowercase letter"}), 400
-    if not any(c.isdigit() for c in password):
+    if not has_digit:
         return jsonify({"error": "Password must contain at least one number"}), 400
 
     user, error = auth.register_user(username, password)
@@ -427,7 +639,7 @@ def auth_register():
 @app.route("/auth/login", methods=["POST"])
 @limiter.limit("10 per minute")  # Prevent brute force attacks
 def auth_login():
-    data = request.get_json()
+    data = fast_json()
     if not data:
         return jsonify({"error": "Invalid JSON body"}), 400
 
@@ -456,7 +668,7 @@ def auth_login():
 @limiter.limit("30 per minute")
 def auth_refresh():
     """Refresh access token using refresh token."""
-    data = request.get_json()
+    data = fast_json()
     if not data:
         return jsonify({"error": "Invalid JSON body"}), 400
 
@@ -484,6 +696,15 @@ def auth_refresh():
         session.close()
 
 
+@app.route("/auth/logout", methods=["POST"])
+@auth.login_required
+def auth_logout():
+    # Tokens are stateless; drop the user's cached encryption keys so they
+    # don't outlive the session
+    auth.forget_user_keys(g.current_user.id)
+    return jsonify({"status": "success"})
+
+
 @app.route("/auth/me", methods=["GET"])
 @auth.login_required
 def auth_me():
@@ -514,24 +735,23 @@ def get_discovery_url():
 # Network status
 @app.route("/network/peers", methods=["GET"])
 def network_peers():
-    # Combine WebSocket nodes and legacy HTTP nodes
-    ws_nodes = get_active_nodes()
-
-    with PEERS_LOCK:
-        now = time.time()
-        http_peers = [
-            {"node_id": p["node_id"], "capacity_gb": p.get("capacity_gb", 0)}
-            for p in PEERS.values()
-            if (now - p["last_heartbeat"]) <= TTL
-        ]
-
-    # Combine, preferring WebSocket nodes
-    all_nodes = {n['node_id']: n for n in http_peers}
-    for n in ws_nodes:
-        all_nodes[n['node_id']] = {'node_id': n['node_id'], 'capacity_gb': n['capacity_gb']}
-
-    peers = list(all_nodes.values())
-    return jsonify({"peers": peers, "count": len(peers)})
+    global _network_peers_body
+    now = time.time()
+    built_at, body = _network_peers_body
+    if now - built_at >= PEER_SNAPSHOT_TTL:
+        # Combine WebSocket nodes and legacy HTTP nodes, preferring WebSocket nodes
+        all_nodes = {}
+        for p in get_alive_peers():
+            all_nodes[p["node_id"]] = p["capacity_gb"]
+        for n in get_active_nodes():
+            all_nodes[n['node_id']] = n['capacity_gb']
+
+        peers = [{"node_id": node_id, "capacity_gb": capacity_gb}
+                 for node_id, capacity_gb in all_nodes.items()]
+        body = json_provider.dumps({"peers": peers, "count": len(peers)})
+        _network_peers_body = (now, body)
+
+    return Response(body, mimetype="application/json")
 
 @app.route("/stats", methods=["GET"])
 def stats():
@@ -565,13 +785,11 @@ def upload_file():
         return jsonify({"error": "No storage nodes available. Please wait for a node to connect."}), 503
 
     try:
-        file_data = file.read()
         filename = file.filename
 
         file_key = crypto.generate_file_key()
-        chunks = list(chunker.chunk_bytes(file_data, CHUNK_SIZE))
-        chunk_hashes = [c[2] for c in chunks]  # (index, bytes, hash)
-        merkle_root = chunker.compute_merkle_root(chunk_hashes)
+        chunk_hashes = []
+        file_size = 0
 
         chunk_assignments = []
         replication = min(REPLICATION_FACTOR, len(nodes))
@@ -579,46 +797,76 @@ def upload_file():
         # Track confirmations for consensus
         node_confirmations = {}  # node_id -> list of chunk hashes stored
 
-        for idx, chunk_bytes_data, chunk_hash in chunks:
-            encrypted = crypto.encrypt_chunk(chunk_bytes_data, file_key)
-            encrypted_hash = chunker.sha256_bytes(encrypted)
+        target_nodes = [node['node_id'] for node in nodes[:replication]]
 
-            assigned_nodes = []
-            for node in nodes[:replication]:
-                node_id = node['node_id']
-                LOG.info(f"Sending chunk {idx} to node {node_id} via WebSocket")
+        def send_copy(task):
+            pos, node_id = task
+            idx, _, encrypted, encrypted_hash, _ = encrypted_chunks[pos]
+            LOG.info(f"Sending chunk {idx} to node {node_id} via WebSocket")
+            return pos, node_id, send_chunk_to_node(node_id, encrypted, encrypted_hash)
+
+        # Read the upload a window of chunks at a time instead of all at once,
+        # so memory stays bounded by the window rather than the file size
+        chunk_stream = chunker.chunk_file(file_obj=file.stream, chunk_size=CHUNK_SIZE)
+        while True:
+            window = list(itertools.islice(chunk_stream, UPLOAD_WINDOW_CHUNKS))
+            if not window:
+                break
 
-                success = send_chunk_to_node(node_id, encrypted, encrypted_hash)
+            encrypted_chunks = []  # (index, hash, encrypted bytes, encrypted hash, compression)
+            for idx, chunk_bytes_data, chunk_hash in window:
+                chunk_hashes.append(chunk_hash)
+                file_size += len(chunk_bytes_data)
+                # Compress before encrypting; ciphertext doesn't compress
+                payload, compression = chunker.compress_chunk(chunk_bytes_data)
+                encrypted = crypto.encrypt_chunk(payload, file_key)
+                encrypted_chunks.append((idx, chunk_hash, encrypted, chunker.sha256_bytes(encrypted), compression))
+            del window
+
+            # Every (chunk, replica) copy is independent; send them concurrently
+            tasks = [(pos, node_id) for pos in range(len(encrypted_chunks)) for node_id in target_nodes]
+            stored_on = [set() for _ in encrypted_chunks]
+            for pos, node_id, success in TRANSFER_POOL.imap_unordered(send_copy, tasks):
+                idx = encrypted_chunks[pos][0]
                 if success:
-                    assigned_nodes.append({"node_id": node_id})
-                    # Track confirmation
-                    if node_id not in node_confirmations:
-                        node_confirmations[node_id] = []
-                    node_confirmations[node_id].append(encrypted_hash)
+                    stored_on[pos].add(node_id)
                     LOG.info(f"Chunk {idx} stored on {node_id}")
                 else:
                     LOG.error(f"Failed to store chunk {idx} on {node_id}")
 
-            chunk_assignments.append({
-                "index": idx,
-                "hash": chunk_hash,
-                "encrypted_hash": encrypted_hash,
-                "nodes": assigned_nodes
-            })
+            for (idx, chunk_hash, _, encrypted_hash, compression), stored in zip(encrypted_chunks, stored_on):
+                assigned_nodes = []
+                for node_id in target_nodes:
+                    if node_id in stored:
+                        assigned_nodes.append({"node_id": node_id})
+                        # Track confirmation
+                        node_confirmations.setdefault(node_id, []).append(encrypted_hash)
+
+                assignment = {
+                    "index": idx,
+                    "hash": chunk_hash,
+                    "encrypted_hash": encrypted_hash,
+                    "nodes": assigned_nodes
+                }
+                if compression:
+                    assignment["compression"] = compression
+                chunk_assignments.append(assignment)
+
+        merkle_root = chunker.compute_merkle_root(chunk_hashes)
 
-        key_salt = base64.b64decode(g.current_user.key_salt)
-        user_key, _ = crypto.derive_key_from_password(user_password, key_salt)
+        user_key = auth.get_user_encryption_key(g.current_user, user_password)
         encrypted_file_key = crypto.encrypt_file_key(file_key, user_key)
-        encrypted_file_key_b64 = base64.b64encode(encrypted_file_key).decode('utf-8')
+        encrypted_file_key_b64 = base64.b64encode(encrypted_file_key).decode('ascii')
 
         file_id = str(uuid.uuid4())
 
         # Build initial confirmations from successful storage
+        now = time.time()
         initial_confirmations = [
             {
                 "node_id": node_id,
                 "chunk_hashes": chunk_hashes,
-                "timestamp": int(time.time()),
+                "timestamp": int(now),
                 "signature": None  # Could add node signatures in future
             }
             for node_id, chunk_hashes in node_confirmations.items()
@@ -628,11 +876,11 @@ def upload_file():
             "file_id": file_id,
             "filename": filename,
             "owner_id": g.current_user.id,
-            "size": len(file_data),
+            "size": file_size,
             "merkle_root": merkle_root,
             "encrypted_file_key": encrypted_file_key_b64,
             "chunks": chunk_assignments,
-            "uploaded_at": time.time()
+            "uploaded_at": now
         }
 
         # Add block with consensus info
@@ -647,8 +895,8 @@ def upload_file():
             "status": "success",
             "file_id": file_id,
             "filename": filename,
-            "size": len(file_data),
-            "chunks": len(chunks),
+            "size": file_size,
+            "chunks": len(chunk_hashes),
             "consensus": {
                 "status": block.get("status", "pending"),
                 "confirmations": len(initial_confirmations),
@@ -670,11 +918,7 @@ def download_file(file_id):
     if not user_password:
         return jsonify({"error": "Password required"}), 400
 
-    file_meta = None
-    for block in blockchain.chain:
-        if block.get("data", {}).get("file_id") == file_id:
-            file_meta = block["data"]
-            break
+    file_meta = blockchain.get_file_metadata(file_id)
 
     if not file_meta:
         return jsonify({"error": "File not found"}), 404
@@ -683,49 +927,76 @@ def download_file(file_id):
         return jsonify({"error": "Access denied"}), 403
 
     try:
-        key_salt = base64.b64decode(g.current_user.key_salt)
-        user_key, _ = crypto.derive_key_from_password(user_password, key_salt)
+        user_key = auth.get_user_encryption_key(g.current_user, user_password)
         encrypted_file_key = base64.b64decode(file_meta["encrypted_file_key"])
         file_key = crypto.decrypt_file_key(encrypted_file_key, user_key)
 
-        chunks_data = []
-        for chunk_info in sorted(file_meta["chunks"], key=lambda x: x["index"]):
+        # Chunk indexes run 0..n-1, so place each one directly instead of sorting
+        chunk_infos = [None] * len(file_meta["chunks"])
+        for chunk_info in file_meta["chunks"]:
+            chunk_infos[chunk_info["index"]] = chunk_info
+
+        # Check the recorded chunk hashes against the merkle root up front;
+        # each chunk is then checked against its own hash as it's decrypted,
+        # so the plaintext never needs a second hashing pass
+        expected_merkle_root = file_meta.get("merkle_root", "")
+        if expected_merkle_root and not chunker.verify_merkle_root(
+                [c["hash"] for c in chunk_infos], expected_merkle_root):
+            LOG.error(f"Merkle root verification failed for file {file_id}")
+            return jsonify({"error": "File integrity check failed - data may be corrupted"}), 500
+
+        def fetch(chunk_info):
+            """Retrieve, decrypt and verify one chunk, trying each node in turn."""
             encrypted_hash = chunk_info["encrypted_hash"]
 
             # Try WebSocket nodes first
-            nodes = chunk_info.get("nodes", [])
-            chunk_retrieved = False
-
-            for node_info in nodes:
+            for node_info in chunk_info.get("nodes", []):
                 node_id = node_info["node_id"]
                 LOG.info(f"Retrieving chunk {chunk_info['index']} from node {node_id}")
 
                 encrypted_chunk = retrieve_chunk_from_node(node_id, encrypted_hash)
                 if encrypted_chunk:
-                    decrypted = crypto.decrypt_chunk(encrypted_chunk, file_key)
-                    chunks_data.append((chunk_info["index"], decrypted))
-                    chunk_retrieved = True
-                    break
-
-            if not chunk_retrieved:
-                LOG.error(f"Failed to retrieve chunk {chunk_info['index']}")
-                return jsonify({"error": f"Failed to retrieve chunk {chunk_info['index']}"}), 500
-
-        chunks_data.sort(key=lambda x: x[0])
-
-        # Verify merkle root for file integrity
-        chunk_hashes = [chunker.sha256_bytes(c[1]) for c in chunks_data]
-        expected_merkle_root = file_meta.get("merkle_root", "")
-        if expected_merkle_root and not chunker.verify_merkle_root(chunk_hashes, expected_merkle_root):
-            LOG.error(f"Merkle root verification failed for file {file_id}")
-            return jsonify({"error": "File integrity check failed - data may be corrupted"}), 500
+                    decrypted = chunker.decompress_chunk(
+                        crypto.decrypt_chunk(encrypted_chunk, file_key),
+                        chunk_info.get("compression"))
+                    if not chunker.verify_chunk_hash(decrypted, chunk_info["hash"]):
+                        LOG.warning(f"Chunk {chunk_info['index']} from node {node_id} failed hash check")
+                        continue
+                    return decrypted
+            return None
 
-        file_data = b"".join([c[1] for c in chunks_data])
+        # Chunks are fetched concurrently, a bounded window ahead of the
+        # client, and handed back in file order
+        results = imap_window(fetch, chunk_infos, DOWNLOAD_READ_AHEAD)
+
+        # Wait for the first chunk before committing to a 200, so a file whose
+        # nodes are all unreachable still gets a proper error response
+        first_chunk = next(results) if chunk_infos else b""
+        if first_chunk is None:
+            LOG.error(f"Failed to retrieve chunk {chunk_infos[0]['index']}")
+            return jsonify({"error": f"Failed to retrieve chunk {chunk_infos[0]['index']}"}), 500
+
+        def generate():
+            # Send each chunk as soon as it has been retrieved and verified
+            # instead of holding the whole file in memory first
+            yield first_chunk
+            for pos, decrypted in enumerate(results, start=1):
+                if decrypted is None:
+                    # Headers are already sent; abort the response, and
+                    # Content-Length lets the client detect the short body
+                    LOG.error(f"Failed to retrieve chunk {chunk_infos[pos]['index']}")
+                    raise IOError(f"Failed to retrieve chunk {chunk_infos[pos]['index']}")
+                yield decrypted
+
+        headers = {"Content-Disposition": f"attachment; filename={file_meta['filename']}"}
+        if "size" in file_meta:
+            headers["Content-Length"] = str(file_meta["size"])
 
         return Response(
-            file_data,
+            stream_with_context(generate()),
             mimetype="application/octet-stream",
-            headers={"Content-Disposition": f"attachment; filename={file_meta['filename']}"}
+            headers=headers,
+            direct_passthrough=True
         )
 
     except Exception as e:
@@ -738,22 +1009,12 @@ def download_file(file_id):
 @app.route("/my-files", methods=["GET"])
 @auth.login_required
 def my_files():
-    files = blockchain.get_user_files(g.current_user.id)
-
-    # Check for deleted files by looking for deletion records
-    deleted_file_ids = set()
-    for block in blockchain.chain:
-        data = block.get("data", {})
-        if data.get("action") == "delete":
-            deleted_file_ids.add(data.get("file_id"))
-
-    # Filter out deleted files
-    active_files = [f for f in files if f["file_id"] not in deleted_file_ids]
+    active_files = blockchain.get_active_user_files(g.current_user.id)
 
     # Calculate total storage used
     total_size = sum(f["size"] for f in active_files)
 
-    return jsonify({
+    return json_response({
         "files": [
             {
                 "file_id": f["file_id"],
@@ -776,17 +1037,7 @@ def my_files():
 @auth.login_required
 def storage_usage():
     """Get storage usage statistics for current user."""
-    files = blockchain.get_user_files(g.current_user.id)
-
-    # Get deleted file IDs
-    deleted_file_ids = set()
-    for block in blockchain.chain:
-        data = block.get("data", {})
-        if data.get("action") == "delete":
-            deleted_file_ids.add(data.get("file_id"))
-
-    # Filter active files
-    active_files = [f for f in files if f["file_id"] not in deleted_file_ids]
+    active_files = blockchain.get_active_user_files(g.current_user.id)
 
     total_size = sum(f["size"] for f in active_files)
     total_chunks = sum(len(f["chunks"]) for f in active_files)
@@ -816,11 +1067,7 @@ def share_file(file_id):
         return jsonify({"error": "Username required"}), 400
 
     # Find the file
-    file_meta = None
-    for block in blockchain.chain:
-        if block.get("data", {}).get("file_id") == file_id:
-            file_meta = block["data"]
-            break
+    file_meta = blockchain.get_file_metadata(file_id)
 
     if not file_meta:
         return jsonify({"error": "File not found"}), 404
@@ -828,11 +1075,8 @@ def share_file(file_id):
     if file_meta.get("owner_id") != g.current_user.id:
         return jsonify({"error": "Only file owner can share"}), 403
 
-    # Check if file is deleted
-    for block in blockchain.chain:
-        block_data = block.get("data", {})
-        if block_data.get("action") == "delete" and block_data.get("file_id") == file_id:
-            return jsonify({"error": "Cannot share deleted file"}), 400
+    if blockchain.is_file_deleted(file_id):
+        return jsonify({"error": "Cannot share deleted file"}), 400
 
     # Find target user
     session = get_session()
@@ -895,13 +1139,7 @@ def shared_with_me():
                     is_unshared = True
                     break
 
-            # Check for delete
-            is_deleted = False
-            for b in blockchain.chain:
-                bd = b.get("data", {})
-                if bd.get("action") == "delete" and bd.get("file_id") == file_id:
-                    is_deleted = True
-                    break
+            is_deleted = blockchain.is_file_deleted(file_id)
 
             if not is_unshared and not is_deleted:
                 shared_files.append({
@@ -912,7 +1150,7 @@ def shared_with_me():
                     "shared_at": data.get("shared_at")
                 })
 
-    return jsonify({"files": shared_files, "count": len(shared_files)})
+    return json_response({"files": shared_files, "count": len(shared_files)})
 
 
 @app.route("/unshare/<file_id>", methods=["POST"])
@@ -928,11 +1166,7 @@ def unshare_file(file_id):
         return jsonify({"error": "Username required"}), 400
 
     # Find the file
-    file_meta = None
-    for block in blockchain.chain:
-        if block.get("data", {}).get("file_id") == file_id:
-            file_meta = block["data"]
-            break
+    file_meta = blockchain.get_file_metadata(file_id)
 
     if not file_meta:
         return jsonify({"error": "File not found"}), 404
@@ -971,11 +1205,7 @@ def unshare_file(file_id):
 @auth.login_required
 def delete_file(file_id):
     # Find the file in blockchain
-    file_meta = None
-    for block in blockchain.chain:
-        if block.get("data", {}).get("file_id") == file_id:
-            file_meta = block["data"]
-            break
+    file_meta = blockchain.get_file_metadata(file_id)
 
     if not file_meta:
         return jsonify({"error": "File not found"}), 404
@@ -983,11 +1213,8 @@ def delete_file(file_id):
     if file_meta.get("owner_id") != g.current_user.id:
         return jsonify({"error": "Access denied"}), 403
 
-    # Check if already deleted
-    for block in blockchain.chain:
-        data = block.get("data", {})
-        if data.get("action") == "delete" and data.get("file_id") == file_id:
-            return jsonify({"error": "File already deleted"}), 400
+    if blockchain.is_file_deleted(file_id):
+        return jsonify({"error": "File already deleted"}), 400
 
     try:
         # Try to delete chunks from storage nodes via WebSocket
@@ -1038,12 +1265,7 @@ def blockchain_stats():
     # Use the enhanced stats from ConsensusBlockchain
     stats = blockchain.get_stats()
 
-    # Get deleted file IDs for filtering
-    deleted_file_ids = set()
-    for block in blockchain.chain:
-        data = block.get("data", {})
-        if data.get("action") == "delete":
-            deleted_file_ids.add(data.get("file_id"))
+    deleted_file_ids = blockchain.get_deleted_file_ids()
 
     # Count only active (non-deleted) files
     active_files = [
@@ -1071,7 +1293,7 @@ def get_consensus_status(block_hash):
     if not block:
         return jsonify({"error": "Block not found"}), 404
 
-    total_nodes = len(get_active_nodes())
+    total_nodes = count_active_nodes()
     required = blockchain.calculate_required_confirmations(total_nodes)
 
     return jsonify({
@@ -1088,7 +1310,7 @@ def get_consensus_status(block_hash):
 def get_pending_blocks():
     """Get all blocks awaiting consensus."""
     pending = blockchain.get_pending_blocks()
-    total_nodes = len(get_active_nodes())
+    total_nodes = count_active_nodes()
     required = blockchain.calculate_required_confirmations(total_nodes)
 
     return jsonify({
@@ -1113,7 +1335,7 @@ def get_pending_blocks():
 @app.route("/consensus/config", methods=["GET"])
 def get_consensus_config():
     """Get current consensus configuration."""
-    total_nodes = len(get_active_nodes())
+    total_nodes = count_active_nodes()
     return jsonify({
         "min_confirmations": CONSENSUS_MIN_CONFIRMATIONS,
         "quorum_percent": CONSENSUS_QUORUM_PERCENT,
@@ -1128,26 +1350,9 @@ def blockchain_blocks():
     limit = int(request.args.get("limit", 50))
     offset = int(request.args.get("offset", 0))
 
-    # Get blocks in reverse order (newest first)
-    all_blocks = list(reversed(blockchain.chain))
-    paginated = all_blocks[offset:offset + limit]
-
-    blocks = []
-    for block in paginated:
-        data = block.get("data", {})
-        blocks.append({
-            "index": block.get("index"),
-            "hash": block.get("hash", "")[:16] + "..." if block.get("hash") else "",
-            "previous_hash": block.get("previous_hash", "")[:16] + "..." if block.get("previous_hash") else "",
-            "timestamp": block.get("timestamp"),
-            "file_id": data.get("file_id"),
-            "filename": data.get("filename", "Genesis Block" if block.get("index") == 0 else "N/A"),
-            "size": data.get("size", 0),
-            "chunks": len(data.get("chunks", [])),
-            "owner_id": data.get("owner_id"),
-            "merkle_root": data.get("merkle_root", "")[:16] + "..." if data.get("merkle_root") else "",
-        })
-    return jsonify({
+    # Newest first; rows are precomputed as blocks are added
+    blocks = blockchain.get_block_summaries(offset, limit)
+    return json_response({
         "blocks": blocks,
         "total": len(blockchain.chain),
         "offset": offset,
@@ -1160,25 +1365,12 @@ def my_blockchain_blocks():
     """Get blocks created by the current user"""
     limit = int(request.args.get("limit", 50))
 
-    user_blocks = []
-    for block in reversed(blockchain.chain):
-        data = block.get("data", {})
-        if data.get("owner_id") == g.current_user.id:
-            user_blocks.append({
-                "index": block.get("index"),
-                "hash": block.get("hash", "")[:16] + "..." if block.get("hash") else "",
-                "previous_hash": block.get("previous_hash", "")[:16] + "..." if block.get("previous_hash") else "",
-                "timestamp": block.get("timestamp"),
-                "file_id": data.get("file_id"),
-                "filename": data.get("filename", "N/A"),
-                "size": data.get("size", 0),
-                "chunks": len(data.get("chunks", [])),
-                "merkle_root": data.get("merkle_root", "")[:16] + "..." if data.get("merkle_root") else "",
-            })
-            if len(user_blocks) >= limit:
-                break
+    user_blocks = [
+        {key: value for key, value in row.items() if key != "owner_id"}
+        for row in blockchain.get_owner_block_summaries(g.current_user.id, limit)
+    ]
 
-    return jsonify({
+    return json_response({
         "blocks": user_blocks,
         "total": len(user_blocks)
     })
@@ -1186,40 +1378,84 @@ def my_blockchain_blocks():
 # Node package download
 @app.route("/download-node", methods=["GET"])
 def download_node():
-    import zipfile
-    import io
-
-    zip_buffer = io.BytesIO()
-    node_package_dir = Path(__file__).parent / "node_package"
-
-    with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zf:
-        if node_package_dir.exists():
-            for file_path in node_package_dir.rglob("*"):
-                if file_path.is_file():
-                    arcname = f"decentra-node/{file_path.relative_to(node_package_dir)}"
-                    zf.write(file_path, arcname)
-
-    zip_buffer.seek(0)
-    return Response(
-        zip_buffer.getvalue(),
+    zip_path = build_node_package_zip()
+    return send_from_directory(
+        str(zip_path.parent), zip_path.name,
         mimetype="application/zip",
-        headers={"Content-Disposition": "attachment; filename=decentra-node.zip"}
+        as_attachment=True,
+        download_name="decentra-node.zip"
     )
 
+NODE_PACKAGE_DIR = Path(__file__).parent / "node_package"
+NODE_PACKAGE_ZIP = DATA_DIR / "decentra-node.zip"
+
+def build_node_package_zip():
+    """Path of the node package zip, rebuilt whenever the package files change."""
+    return package_zip.build_node_package_zip(NODE_PACKAGE_DIR, NODE_PACKAGE_ZIP)
+
 # =============================================================================
-# Reaper Thread (for legacy HTTP nodes)
+# Reaper (legacy HTTP peers and WebSocket nodes)
 # =============================================================================
+def reap_nodes(now):
+    """Drop WebSocket nodes that haven't sent a heartbeat in TTL*2 seconds."""
+    # Copy the entries (atomic under the GIL) and scan without the lock; only
+    # the removals, re-checked against last_seen, happen under NODES_LOCK
+    dead = [node_id for node_id, info in list(NODES.items())
+            if now - info['last_seen'] > TTL * 2]
+    if not dead:
+        return
+
+    reaped_sids = []
+    with NODES_LOCK:
+        for node_id in dead:
+            info = NODES.get(node_id)
+            if info is None or now - info['last_seen'] <= TTL * 2:
+                continue  # Gone already, or heartbeat arrived meanwhile
+            LOG.info(f"Reaping silent WebSocket node: {node_id}")
+            del NODES[node_id]
+            reaped_sids.append(info['sid'])
+    invalidate_network_peers()
+
+    # Close their sockets too; a node that is still alive reconnects and
+    # registers again instead of lingering connected but unregistered
+    for sid in reaped_sids:
+        try:
+            socketio.server.disconnect(sid, namespace='/')
+        except Exception as e:
+            LOG.debug(f"Disconnecting reaped node socket {sid} failed: {e}")
+
 def reaper_thread():
     while True:
-        time.sleep(max(10, TTL // 3))
+        # socketio.sleep yields to the gevent hub even without monkey-patching
+        socketio.sleep(max(10, TTL // 3))
+        now = time.time()
+        expire_heartbeats(now)
+        reap_nodes(now)
+
+        # Only peers that already expired are candidates; a heartbeat since
+        # then makes the entry stale and it is dropped
+        dead = []
+        with HB_HEAP_LOCK:
+            while REAP_HEAP and now - REAP_HEAP[0][0] > TTL * 2:
+                ts, node_id = heapq.heappop(REAP_HEAP)
+                if HEARTBEATS.get(node_id) == ts:
+                    dead.append(node_id)
+        if not dead:
+            continue
+
         with PEERS_LOCK:
-            now = time.time()
-            dead = [nid for nid, p in PEERS.items() if (now - p["last_heartbeat"]) > TTL * 2]
             for node_id in dead:
+                if HEARTBEATS.get(node_id, 0.0) > now - TTL * 2:
+                    continue  # Heartbeat arrived meanwhile
                 LOG.info(f"Reaping dead node: {node_id}")
-                del PEERS[node_id]
-
-threading.Thread(target=reaper_thread, daemon=True).start()
+                PEERS.pop(node_id, None)
+                HEARTBEATS.pop(node_id, None)
+                ALIVE.discard(node_id)
+            invalidate_peer_snapshot()
+
+# Runs as a greenlet under gevent (a plain thread otherwise), so the sweep
+# doesn't hand off between an OS thread and the gevent hub
+socketio.start_background_task(reaper_thread)
 
 # =============================================================================
 # Main
@@ -11,12 +11,14 @@ Features:
 - Block status: pending → confirmed
 """
 
+import os
 import json
+import atexit
 import hashlib
 import time
 import threading
 from pathlib import Path
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Set
 from enum import Enum
 
 import sys
@@ -28,6 +30,10 @@ from config import (
     CONSENSUS_ALLOW_PENDING,
 )
 
+# How long the writer waits after a change before rewriting the chain, so a
+# burst of uploads/confirmations is persisted with a single write
+SAVE_COALESCE_SECONDS = 0.05
+
 
 class BlockStatus(str, Enum):
     """Block consensus status."""
@@ -122,8 +128,21 @@ class ConsensusBlockchain:
         self.lock = threading.Lock()
         self.chain: List[Dict] = []
         self._pending_blocks: Dict[str, Dict] = {}  # block_hash -> block for quick lookup
+        self._by_file_id: Dict[str, Dict] = {}  # file_id -> first block carrying it
+        self._by_owner: Dict[str, List[Dict]] = {}  # owner_id -> blocks, in chain order
+        self._deleted_ids: Set[str] = set()  # file_ids with a deletion record
+        self._files_by_owner: Dict[str, Dict[str, Dict]] = {}  # owner_id -> file_id -> upload block
+        self._summaries: List[Dict] = []  # explorer display row per block, by index
         self._load()
 
+        # Persistence happens on a background writer so requests that add or
+        # confirm blocks don't wait on rewriting the JSON file
+        self._dirty = False
+        self._write_lock = threading.Lock()  # Serializes flushes
+        self._save_requested = threading.Event()
+        threading.Thread(target=self._writer_loop, name="blockchain-writer", daemon=True).start()
+        atexit.register(self.flush)
+
     def _load(self):
         """Load chain from disk."""
         try:
@@ -140,15 +159,51 @@ class ConsensusBlockchain:
                 self._validate_chain()
                 # Index pending blocks
                 self._index_pending()
+                self._build_indexes()
         except Exception as e:
             print(f"[blockchain] Error loading chain: {e}, starting fresh")
             self.chain = []
+            self._pending_blocks = {}
+            self._by_file_id = {}
+            self._by_owner = {}
+            self._deleted_ids = set()
+            self._files_by_owner = {}
+            self._summaries = []
 
     def _save(self):
-        """Persist chain to disk."""
-        self.path.parent.mkdir(parents=True, exist_ok=True)
-        with open(self.path, "w") as f:
-            json.dump(self.chain, f, indent=2)
+        """Schedule the chain to be persisted. Call with self.lock held."""
+        self._dirty = True
+        self._save_requested.set()
+
+    def _writer_loop(self):
+        """Background thread: flush whenever a save has been requested."""
+        while True:
+            self._save_requested.wait()
+            # Let further changes pile up so the whole batch is written once
+            time.sleep(SAVE_COALESCE_SECONDS)
+            self._save_requested.clear()
+            self.flush()
+
+    def flush(self):
+        """Write the chain to disk now if it has unsaved changes."""
+        with self._write_lock:
+            with self.lock:
+                if not self._dirty:
+                    return
+                # Serialize under the lock; blocks are mutated in place
+                payload = json.dumps(self.chain, indent=2)
+                self._dirty = False
+
+            tmp_path = self.path.with_name(self.path.name + ".tmp")
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with open(tmp_path, "w") as f:
+                    f.write(payload)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                print(f"[blockchain] Error saving chain: {e}")
+                with self.lock:
+                    self._dirty = True
 
     def _index_pending(self):
         """Index pending blocks for quick lookup."""
@@ -158,6 +213,50 @@ class ConsensusBlockchain:
             if block.get("status") == BlockStatus.PENDING
         }
 
+    def _build_indexes(self):
+        """Build the file_id, owner_id and deletion lookup indexes from the chain."""
+        self._by_file_id = {}
+        self._by_owner = {}
+        self._deleted_ids = set()
+        self._files_by_owner = {}
+        self._summaries = []
+        for block in self.chain:
+            self._index_block(block)
+
+    def _index_block(self, block: Dict):
+        """Add one block to the lookup indexes."""
+        data = block.get("data", {})
+        file_id = data.get("file_id")
+        if file_id:
+            # First occurrence wins, matching a front-to-back scan
+            self._by_file_id.setdefault(file_id, block)
+            if data.get("action") == "delete":
+                self._deleted_ids.add(file_id)
+        owner_id = data.get("owner_id")
+        if owner_id is not None:
+            self._by_owner.setdefault(owner_id, []).append(block)
+            if file_id and not data.get("action"):
+                # Upload blocks only; share/unshare/delete records carry an action
+                self._files_by_owner.setdefault(owner_id, {}).setdefault(file_id, block)
+        self._summaries.append(self._block_summary(block))
+
+    @staticmethod
+    def _block_summary(block: Dict) -> Dict:
+        """Display row for the block explorer, with shortened hashes."""
+        data = block.get("data", {})
+        return {
+            "index": block.get("index"),
+            "hash": block.get("hash", "")[:16] + "..." if block.get("hash") else "",
+            "previous_hash": block.get("previous_hash", "")[:16] + "..." if block.get("previous_hash") else "",
+            "timestamp": block.get("timestamp"),
+            "file_id": data.get("file_id"),
+            "filename": data.get("filename", "Genesis Block" if block.get("index") == 0 else "N/A"),
+            "size": data.get("size", 0),
+            "chunks": len(data.get("chunks", [])),
+            "owner_id": data.get("owner_id"),
+            "merkle_root": data.get("merkle_root", "")[:16] + "..." if data.get("merkle_root") else "",
+        }
+
     def _validate_chain(self):
         """Validate chain integrity."""
         for i, block in enumerate(self.chain):
@@ -248,6 +347,7 @@ class ConsensusBlockchain:
 
             if status == BlockStatus.PENDING:
                 self._pending_blocks[entry["hash"]] = entry
+            self._index_block(entry)
 
             self._save()
 
@@ -376,20 +476,37 @@ class ConsensusBlockchain:
         Get all blocks owned by a specific user.
         This is the primary privacy filter.
         """
-        return [
-            block for block in self.chain
-            if block.get("data", {}).get("owner_id") == owner_id
-        ]
+        return list(self._by_owner.get(owner_id, ()))
+
+    def get_block_summaries(self, offset: int = 0, limit: int = 50) -> List[Dict]:
+        """Explorer rows, newest first, skipping the newest `offset` blocks."""
+        end = len(self._summaries) - max(offset, 0)
+        if end <= 0 or limit <= 0:
+            return []
+        return self._summaries[max(end - limit, 0):end][::-1]
+
+    def get_owner_block_summaries(self, owner_id: str, limit: int = 50) -> List[Dict]:
+        """Explorer rows for one owner's blocks, newest first."""
+        if limit <= 0:
+            return []
+        blocks = self._by_owner.get(owner_id, [])
+        return [self._summaries[block["index"]] for block in reversed(blocks[-limit:])]
 
     def get_file_metadata(self, file_id: str) -> Optional[Dict]:
         """
         Find file metadata by file_id.
         Returns the block's data if found.
         """
-        for block in self.chain:
-            if block.get("data", {}).get("file_id") == file_id:
-                return block["data"]
-        return None
+        block = self._by_file_id.get(file_id)
+        return block["data"] if block else None
+
+    def is_file_deleted(self, file_id: str) -> bool:
+        """Whether a deletion record exists for file_id."""
+        return file_id in self._deleted_ids
+
+    def get_deleted_file_ids(self) -> Set[str]:
+        """All file_ids that have a deletion record."""
+        return set(self._deleted_ids)
 
     def get_file_by_stored_name(self, stored_name: str) -> Optional[Dict]:
         """Find file metadata by stored_name."""
@@ -410,7 +527,7 @@ class ConsensusBlockchain:
             List of file data dictionaries
         """
         files = []
-        for block in self.chain:
+        for block in self._by_owner.get(owner_id, ()):
             data = block.get("data", {})
             status = block.get("status", BlockStatus.CONFIRMED)
 
@@ -423,16 +540,41 @@ class ConsensusBlockchain:
                 continue
 
             if data.get("owner_id") == owner_id and data.get("file_id"):
-                files.append({
-                    "block_index": block["index"],
-                    "block_hash": block["hash"],
-                    "timestamp": block["timestamp"],
-                    "status": status,
-                    "confirmations_count": len(block.get("confirmations", [])),
-                    **data,
-                })
+                files.append(self._file_record(block, status))
         return files
 
+    def get_active_user_files(self, owner_id: str, include_pending: bool = True) -> List[Dict]:
+        """
+        Get a user's uploaded files that haven't been deleted.
+
+        Unlike get_user_files, share/unshare/delete records are not included.
+        """
+        files = []
+        for file_id, block in self._files_by_owner.get(owner_id, {}).items():
+            if file_id in self._deleted_ids:
+                continue
+
+            status = block.get("status", BlockStatus.CONFIRMED)
+            if status == BlockStatus.REJECTED:
+                continue
+            if not include_pending and status == BlockStatus.PENDING:
+                continue
+
+            files.append(self._file_record(block, status))
+        return files
+
+    @staticmethod
+    def _file_record(block: Dict, status: str) -> Dict:
+        """Flatten a block into the file dict returned by the user-file queries."""
+        return {
+            "block_index": block["index"],
+            "block_hash": block["hash"],
+            "timestamp": block["timestamp"],
+            "status": status,
+            "confirmations_count": len(block.get("confirmations", [])),
+            **block.get("data", {}),
+        }
+
     def verify_ownership(self, file_id: str, owner_id: str) -> bool:
         """Verify that a file belongs to a specific owner."""
         metadata = self.get_file_metadata(file_id)
@@ -6,9 +6,11 @@ Provides:
 - File splitting into fixed-size chunks
 - Merkle tree computation for integrity verification
 - Chunk reassembly with verification
+- Optional per-chunk compression
 """
 
 import hashlib
+import zlib
 from pathlib import Path
 from typing import List, Tuple, Generator, Optional, BinaryIO
 import io
@@ -17,6 +19,9 @@ import sys
 sys.path.insert(0, str(__file__).rsplit("/", 2)[0])
 from config import CHUNK_SIZE
 
+# Leading bytes trial-compressed to decide whether a chunk is worth compressing
+COMPRESSION_SAMPLE_SIZE = 64 * 1024
+
 
 def sha256_bytes(data: bytes) -> str:
     """Compute SHA-256 hash of bytes, return lowercase hex string."""
@@ -72,6 +77,53 @@ def chunk_bytes(data: bytes, chunk_size: int = CHUNK_SIZE) -> Generator[Tuple[in
     return chunk_file(file_obj=io.BytesIO(data), chunk_size=chunk_size)
 
 
+def compress_chunk(data: bytes) -> Tuple[bytes, Optional[str]]:
+    """
+    Compress a chunk if that actually saves space.
+    
+    Already-compressed content (images, video, archives) is detected from a
+    fast trial on the first COMPRESSION_SAMPLE_SIZE bytes and left alone.
+    
+    Returns:
+        (payload, compression) - compression is "zlib", or None if the
+        payload is the original data
+    """
+    sample = data[:COMPRESSION_SAMPLE_SIZE]
+    if not sample or len(zlib.compress(sample, 1)) > len(sample) * 0.9:
+        return data, None
+    
+    packed = zlib.compress(data, 6)
+    if len(packed) >= len(data):
+        return data, None
+    return packed, "zlib"
+
+
+def decompress_chunk(data: bytes, compression: Optional[str]) -> bytes:
+    """
+    Undo compress_chunk given the compression it reported.
+    """
+    if not compression:
+        return data
+    if compression == "zlib":
+        return zlib.decompress(data)
+    raise ValueError(f"Unsupported chunk compression: {compression}")
+
+
+def _merkle_parents(level: bytes) -> bytes:
+    """
+    Hash one Merkle level into the next.
+    
+    Both levels are concatenated 32-byte digests. If the level has an odd
+    number of nodes, the last one is duplicated. Pairs are hashed straight
+    from memoryview slices, so no per-pair bytes objects are built.
+    """
+    if len(level) % 64:
+        level += level[-32:]
+    view = memoryview(level)
+    sha256 = hashlib.sha256
+    return b"".join([sha256(view[i:i + 64]).digest() for i in range(0, len(level), 64)])
+
+
 def compute_merkle_root(chunk_hashes: List[str]) -> str:
     """
     Compute Merkle root from a list of chunk hashes.
@@ -92,24 +144,13 @@ def compute_merkle_root(chunk_hashes: List[str]) -> str:
         # Empty file: hash of empty string
         return hashlib.sha256(b"").hexdigest()
     
-    # Convert hex strings to bytes
-    layer = [bytes.fromhex(h) for h in chunk_hashes]
+    # Decode all leaves at once into one contiguous buffer
+    level = bytes.fromhex("".join(chunk_hashes))
     
-    while len(layer) > 1:
-        # If odd, duplicate last
-        if len(layer) % 2 == 1:
-            layer.append(layer[-1])
-        
-        # Compute next layer
-        next_layer = []
-        for i in range(0, len(layer), 2):
-            combined = layer[i] + layer[i + 1]
-            parent_hash = hashlib.sha256(combined).digest()
-            next_layer.append(parent_hash)
-        
-        layer = next_layer
+    while len(level) > 32:
+        level = _merkle_parents(level)
     
-    return layer[0].hex()
+    return level.hex()
 
 
 def build_merkle_tree(chunk_hashes: List[str]) -> List[List[str]]:
@@ -123,22 +164,11 @@ def build_merkle_tree(chunk_hashes: List[str]) -> List[List[str]]:
         return [[hashlib.sha256(b"").hexdigest()]]
     
     layers = [chunk_hashes.copy()]
-    current = [bytes.fromhex(h) for h in chunk_hashes]
-    
-    while len(current) > 1:
-        if len(current) % 2 == 1:
-            current.append(current[-1])
-        
-        next_layer = []
-        next_layer_hex = []
-        for i in range(0, len(current), 2):
-            combined = current[i] + current[i + 1]
-            parent = hashlib.sha256(combined).digest()
-            next_layer.append(parent)
-            next_layer_hex.append(parent.hex())
-        
-        current = next_layer
-        layers.append(next_layer_hex)
+    level = bytes.fromhex("".join(chunk_hashes))
+    
+    while len(level) > 32:
+        level = _merkle_parents(level)
+        layers.append([level[i:i + 32].hex() for i in range(0, len(level), 32)])
     
     return layers
 
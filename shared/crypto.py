@@ -172,12 +172,12 @@ def compute_hash(data: bytes) -> str:
 
 def encode_bytes_to_str(data: bytes) -> str:
     """Encode bytes to base64 string for JSON storage."""
-    return base64.b64encode(data).decode("utf-8")
+    return base64.b64encode(data).decode("ascii")
 
 
 def decode_str_to_bytes(data: str) -> bytes:
     """Decode base64 string back to bytes."""
-    return base64.b64decode(data.encode("utf-8"))
+    return base64.b64decode(data)
 
 
 # Convenience aliases
@@ -0,0 +1,53 @@
+# shared/json_provider.py
+"""
+Fast JSON support for the Flask apps.
+
+Uses orjson when it is installed and falls back to the standard library
+otherwise, so callers never need to check which one is available.
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(obj) -> bytes:
+    """Serialize obj to UTF-8 JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data):
+    """Parse JSON from bytes or str."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def install(app) -> bool:
+    """
+    Make jsonify() and request.get_json() on app use orjson.
+
+    Returns True if the orjson provider was installed.
+    """
+    if orjson is None:
+        return False
+
+    from flask.json.provider import DefaultJSONProvider
+
+    class OrjsonProvider(DefaultJSONProvider):
+        """Flask JSON provider that encodes/decodes with orjson."""
+
+        def dumps(self, obj, **kwargs):
+            return orjson.dumps(obj, default=self.default,
+                                option=orjson.OPT_NON_STR_KEYS).decode()
+
+        def loads(self, s, **kwargs):
+            return orjson.loads(s)
+
+    app.json = OrjsonProvider(app)
+    return True
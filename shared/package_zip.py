@@ -0,0 +1,86 @@
+# shared/package_zip.py
+"""
+Cached zip archive of the storage node package for DecentraStore.
+
+The archive is written next to a signature of the files it was built from
+(relative path, size and mtime of each), and is rebuilt whenever that
+signature changes - including when files are added, deleted, or replaced
+by copies carrying older timestamps.
+"""
+
+import os
+import hashlib
+import threading
+import zipfile
+from pathlib import Path
+
+ARCHIVE_ROOT = "decentra-node"
+
+# Written when the package directory is missing, so the download still works
+_STUB_FILES = {
+    "storage_node.py": '''#!/usr/bin/env python3
+"""DecentraStore Storage Node - Standalone"""
+# Download the full package from the website
+print("Error: Please download the complete node package from the website.")
+''',
+    "README.md": "Download the full package from the website.",
+}
+
+_build_lock = threading.Lock()
+
+
+def _package_files(package_dir: Path):
+    """Files to include, sorted by relative path; bytecode caches are skipped."""
+    if not package_dir.is_dir():
+        return []
+    return sorted(
+        (p for p in package_dir.rglob("*")
+         if p.is_file() and "__pycache__" not in p.relative_to(package_dir).parts),
+        key=lambda p: p.relative_to(package_dir).as_posix(),
+    )
+
+
+def _signature(package_dir: Path, files) -> str:
+    """Digest of (relative path, size, mtime) for every file in the package."""
+    digest = hashlib.sha256()
+    if not files and not package_dir.is_dir():
+        digest.update(b"stub")
+    for path in files:
+        st = path.stat()
+        digest.update(f"{path.relative_to(package_dir).as_posix()}\0{st.st_size}\0{st.st_mtime_ns}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def build_node_package_zip(package_dir: Path, zip_path: Path) -> Path:
+    """
+    Return zip_path, (re)building the archive from package_dir only if the
+    files have changed since it was last built.
+    """
+    package_dir = Path(package_dir)
+    zip_path = Path(zip_path)
+    sig_path = zip_path.with_name(zip_path.name + ".sig")
+
+    with _build_lock:
+        files = _package_files(package_dir)
+        signature = _signature(package_dir, files)
+        try:
+            if zip_path.exists() and sig_path.read_text() == signature:
+                return zip_path
+        except FileNotFoundError:
+            pass
+
+        zip_path.parent.mkdir(parents=True, exist_ok=True)
+        # Per-process temp name; another app may share the same data directory
+        tmp_path = zip_path.with_name(f"{zip_path.name}.{os.getpid()}.tmp")
+        # strict_timestamps=False: reproducible builds may stamp files at epoch 0
+        with zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_DEFLATED, strict_timestamps=False) as zf:
+            if package_dir.is_dir():
+                for file_path in files:
+                    zf.write(file_path, f"{ARCHIVE_ROOT}/{file_path.relative_to(package_dir).as_posix()}")
+            else:
+                for name, content in _STUB_FILES.items():
+                    zf.writestr(f"{ARCHIVE_ROOT}/{name}", content)
+        os.replace(tmp_path, zip_path)
+        # Written last: a crash before this leaves a mismatch and forces a rebuild
+        sig_path.write_text(signature)
+        return zip_path